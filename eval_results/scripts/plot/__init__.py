@@ -0,0 +1,19 @@
+"""
+Plotting package for eval results
+
+Copyright (c) 2024.
+Author: Joseph Leisten
+E-mail: joseph.leisten@rwth-aachen.de
+"""
+
+import os
+import tempfile
+
+# Matplotlib uses a new temporary config dir on every run (and rebuilds its
+# font cache) if the default one is not writable. Has to be set before
+# matplotlib is imported.
+if "MPLCONFIGDIR" not in os.environ and \
+        not os.access(os.path.expanduser("~"), os.W_OK):
+    os.environ["MPLCONFIGDIR"] = os.path.join(tempfile.gettempdir(),
+                                              "matplotlib_mapxchange")
+    os.makedirs(os.environ["MPLCONFIGDIR"], exist_ok=True)
@@ -6,14 +6,20 @@ Author: Joseph Leisten
 E-mail: joseph.leisten@rwth-aachen.de
 """
 
-import json
 import math
 import os
 from contextlib import contextmanager
 
-import matplotlib.pyplot as plt
+import matplotlib
+
+# Plots are only written to file, no GUI backend required.
+# The backend has to be selected before pyplot is imported.
+PRINT = True
+if PRINT:
+    matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt  # noqa: E402
 import numpy as np
-import scipy.stats
 from matplotlib import patches, transforms
 from matplotlib import ticker
 from matplotlib.axes import Axes
@@ -23,6 +29,7 @@ from matplotlib.lines import Line2D
 from scipy.constants import golden as golden_ratio
 
 from eval_results.scripts.plot.colors import bar_colors, blue, orange
+from eval_results.scripts.plot.reader import mean_confidence_interval
 from src.lib import config
 
 
@@ -30,7 +37,6 @@ from src.lib import config
 # Constants
 # -----------------------------------------------------------------------------
 EXTENSION = '.pdf'
-PRINT = True
 TITLE = False
 
 
@@ -48,7 +54,6 @@ def golden_height(width: float) -> float:
     return (1.0 / golden_ratio) * width
 
 
-INPUT_DIR = config.EVAL_DIR
 OUTPUT_DIR = os.path.dirname(config.WORKING_DIR) + '/eval_results/plots/'
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 y_lim_fac = 1.25
@@ -166,6 +171,12 @@ class Legend(object):
         return legend
 
 
+def make_line_labels(colors: list[str], labels: list[str]) -> list[tuple]:
+    """Create custom legend labels showing a line in each of the colors."""
+    return [(Line2D([], [], color=c, lw=1), label)
+            for c, label in zip(colors, labels)]
+
+
 def set_minor_xticks(ax: Axes, minor_xticks: list[float],
                      minor_xlabels: list[str],
                      rotation: float = None,
@@ -277,162 +288,6 @@ def add_text_boxes_into_bars(axis: Axes, text_boxes: list[dict],
                   verticalalignment='center')
 
 
-def mean_confidence_interval(data: list, confidence: float = 0.99) -> \
-        tuple[float, float]:
-    """
-    Compute mean and corresponding confidence interval of given data.
-
-    :param data: List of numbers to compute mean and interval for
-    :param confidence: Confidence interval to use, default: 99%
-    """
-    a = 1.0 * np.array(data)
-    n = len(a)
-    if n == 1:
-        return a[0], 0
-    m, se = np.mean(a), scipy.stats.sem(a)
-    h: float = se * scipy.stats.t.ppf((1 + confidence) / 2., n - 1)
-    return float(m), h
-
-
-def convert_to_mb(data: dict) -> dict:
-    """Divide all keys by 10^6"""
-    for x in data:
-        data[x] = [y / 1000000 for y in data[x]]
-    return data
-
-def convert_to_min(data: dict) -> dict:
-    """Divide all y-values by 60."""
-    for x in data:
-        data[x] = [y / 60 for y in data[x]]
-    return data
-
-
-# -----------------------------------------------------------------------------
-# -----------------------------------------------------------------------------
-# Read input from file
-# -----------------------------------------------------------------------------
-def remove_head(lines: list[str]) -> list[str]:
-    """Remove header from list of lines."""
-    i = 0
-    while True:
-        if "END HEADER" in lines[i]:
-            break
-        else:
-            i += 1
-    return lines[i + 1:]
-
-
-def read_data(file: str, x_index: int, y_index: int = -1) -> dict:
-    """
-    Read the data from a file.
-    :param file: Input file
-    :param x_index: Index of X column
-    :param y_index: [optional] Index of Y column
-    :return: Dict in following Format:
-    X-values as keys, Y-values as List, even if there is only one.
-    {
-        x1: [y1, y2, y3],
-        x2: [y4],
-        x3. [y5, y6]
-    }
-    """
-    with open(file, "r", encoding='utf-8') as fd:
-        lines = fd.readlines()
-    lines = remove_head(lines)
-
-    # Read out data
-    result = {}
-    for line in lines:
-        values = line.split(";")
-        x = int(values[x_index])
-        y = float(values[y_index])
-        if x in result:
-            result[x].append(y)
-        else:
-            result[x] = [y]
-    return result
-
-
-def read_data_mult(file: str, x_index: int, y_index_start: int, y_index_end: int,
-                   z_index: int, z_zero: int) -> dict[int, dict]:
-    """
-    Read multiple data dicts from a file.
-
-    :param file: Input file
-    :param x_index: Index of X column
-    :param y_index: [optional] Index of Y column
-    :param z_index: The index of the different curves
-    :param z_zero: Index of values that have to be zero
-    :return: Dict of dicts in following Format:
-    X-values as keys, Y-values as List, even if there is only one.
-    {
-        z1:{
-            x1: [y1, y2, y3],
-            x2: [y4],
-            x3. [y5, y6]
-        },
-        z2:{
-            x1: [y1, y2, y3],
-            x2: [y4],
-            x3. [y5, y6]
-        }
-    }
-    """
-    with open(file, "r", encoding='utf-8') as fd:
-        lines = fd.readlines()
-    lines = remove_head(lines)
-
-    # Read out data
-    result = {}
-    for line in lines:
-        values = line.split(";")
-        if int(values[z_zero]):
-            continue
-        x = int(values[x_index])
-        y = float(values[y_index_end]) - float(values[y_index_start])
-        z = int(values[z_index])
-        if z not in result:
-            result[z] = {}
-        if x in result[z]:
-            result[z][x].append(y)
-        else:
-            result[z][x] = [y]
-    return result
-
-
-def read_ram(file: str, x_index: int, y_index: int = -1) -> dict:
-    """
-    Read maximal ram value for each x.
-    :param file: Input file
-    :param x_index: Index of X column
-    :param y_index: [optional] Index of Y column
-    :param x_is_float: [optional] x is interpreted as float instead of int
-    :return: Dict in following Format:
-    X-values as keys, Y-values as List, even if there is only one.
-    {
-        x1: [y1, y2, y3],
-        x2: [y4],
-        x3. [y5, y6]
-    }
-    """
-    with open(file, "r", encoding='utf-8') as fd:
-        lines = fd.readlines()
-    lines = remove_head(lines)
-
-    # Read out data
-    result = {}
-    for line in lines:
-        values = line.split(";")
-        x = int(values[x_index])
-        ram_value = json.loads(values[y_index])
-        y = float(ram_value[0])
-        if x in result:
-            result[x].append(y)
-        else:
-            result[x] = [y]
-    return result
-
-
 # -----------------------------------------------------------------------------
 # -----------------------------------------------------------------------------
 # Plot Scripts
@@ -0,0 +1,277 @@
+"""
+Reading and preparing eval results for plotting
+
+Kept separate from the plotting functions, so that scripts only printing
+numbers do not have to import matplotlib.
+
+Copyright (c) 2024.
+Author: Joseph Leisten
+E-mail: joseph.leisten@rwth-aachen.de
+"""
+
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import scipy.stats
+
+from src.lib import config
+
+
+INPUT_DIR = config.EVAL_DIR
+CACHE_EXTENSION = '.npy'
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+# Statistics and units
+# -----------------------------------------------------------------------------
+def mean_confidence_interval(data: list, confidence: float = 0.99) -> \
+        tuple[float, float]:
+    """
+    Compute mean and corresponding confidence interval of given data.
+
+    :param data: List of numbers to compute mean and interval for
+    :param confidence: Confidence interval to use, default: 99%
+    """
+    a = 1.0 * np.array(data)
+    n = len(a)
+    if n == 1:
+        return a[0], 0
+    m, se = np.mean(a), scipy.stats.sem(a)
+    h: float = se * scipy.stats.t.ppf((1 + confidence) / 2., n - 1)
+    return float(m), h
+
+
+def mean_confidence_intervals(data: np.ndarray, confidence: float = 0.99) -> \
+        tuple[np.ndarray, np.ndarray]:
+    """
+    Compute means and confidence intervals for each row of given data.
+
+    :param data: 2D array with one row of numbers per series
+    :param confidence: Confidence interval to use, default: 99%
+    :return: Means and interval half-widths, one per row
+    """
+    a = 1.0 * np.asarray(data)
+    n = a.shape[1]
+    m = np.mean(a, axis=1)
+    if n == 1:
+        return m, np.zeros_like(m)
+    se = scipy.stats.sem(a, axis=1)
+    h = se * scipy.stats.t.ppf((1 + confidence) / 2., n - 1)
+    return m, h
+
+
+def print_mean_confidence_intervals(labels: list[str], data: list[list]) -> None:
+    """
+    Print mean and confidence interval of each series and their totals.
+
+    :param labels: Label to print for each series
+    :param data: List of series, all of the same length
+    """
+    means, devs = mean_confidence_intervals(data)
+    for label, m, h in zip(labels, means, devs):
+        print(label)
+        print((float(m), h))
+    print("Total Mean")
+    print(means.sum())
+    print("Total Deviation")
+    print(devs.sum())
+
+
+def convert_to_mb(data: dict) -> dict:
+    """Divide all keys by 10^6"""
+    for x in data:
+        data[x] = (np.asarray(data[x]) / 1000000).tolist()
+    return data
+
+def convert_to_min(data: dict) -> dict:
+    """Divide all y-values by 60."""
+    for x in data:
+        data[x] = (np.asarray(data[x]) / 60).tolist()
+    return data
+
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+# Read input from file
+# -----------------------------------------------------------------------------
+def remove_head(lines: list[str]) -> list[str]:
+    """Remove header from list of lines."""
+    i = 0
+    while True:
+        if "END HEADER" in lines[i]:
+            break
+        else:
+            i += 1
+    return lines[i + 1:]
+
+
+@lru_cache(maxsize=32)
+def count_header_rows(file: str, mtime: float) -> int:
+    """
+    Count the lines up to and including the end of the header.
+    :param file: Input file
+    :param mtime: Modification time of the file, invalidates cached counts
+    :return: Number of rows to skip
+    """
+    with open(file, "r", encoding='utf-8') as fd:
+        return next(i for i, line in enumerate(fd)
+                    if "END HEADER" in line) + 1
+
+
+@lru_cache(maxsize=8)
+def read_table(file: str) -> np.ndarray:
+    """
+    Parse all rows of a file once, repeated calls are served from cache.
+    The parsed table is also stored next to the file (FILE.npy) and reused
+    by later runs as long as the file has not been modified.
+    :param file: Input file
+    :return: Read-only array with one row per line, non-numeric values as NaN
+    """
+    cache_file = file + CACHE_EXTENSION
+    if (os.path.exists(cache_file)
+            and os.path.getmtime(cache_file) >= os.path.getmtime(file)):
+        table = np.load(cache_file)
+    else:
+        header_rows = count_header_rows(file, os.path.getmtime(file))
+        table = np.genfromtxt(file, delimiter=';', skip_header=header_rows,
+                              dtype=float, ndmin=2)
+        try:
+            np.save(cache_file, table)
+        except OSError:
+            # Input directory not writable, parse again next time
+            pass
+    table.setflags(write=False)
+    return table
+
+
+def read_data(file: str, x_index: int, y_index: int = -1) -> dict:
+    """
+    Read the data from a file.
+    :param file: Input file
+    :param x_index: Index of X column
+    :param y_index: [optional] Index of Y column
+    :return: Dict in following Format:
+    X-values as keys, Y-values as List, even if there is only one.
+    {
+        x1: [y1, y2, y3],
+        x2: [y4],
+        x3. [y5, y6]
+    }
+    """
+    return read_stacks(file, x_index, [y_index])[0]
+
+
+def read_stacks(file: str, x_index: int, y_indices: list[int],
+                diff: bool = False, zero_indices: list[int] = None,
+                scale: float = 1) -> list[dict]:
+    """
+    Read multiple Y columns from a file at once.
+    :param file: Input file
+    :param x_index: Index of X column
+    :param y_indices: Indices of Y columns
+    :param diff: [optional] Subtract each Y column from the next one to turn
+        cumulative timestamps into durations of the phases in between
+    :param zero_indices: [optional] Indices of values that have to be zero
+    :param scale: [optional] Divisor for all Y values, e.g., 60 for minutes
+    :return: List with one dict per Y column (one less if diff is set) in
+    the format of read_data.
+    """
+    table = read_table(file)
+    if zero_indices is not None:
+        table = table[(table[:, zero_indices] == 0).all(axis=1)]
+    xs = table[:, x_index].astype(int)
+    ys = table[:, y_indices]
+    if diff:
+        ys = np.diff(ys, axis=1)
+    if scale != 1:
+        ys = ys / scale
+
+    # Read out data
+    result = [{} for _ in range(ys.shape[1])]
+    for x in dict.fromkeys(xs.tolist()):
+        for stack, y in zip(result, ys[xs == x].T):
+            stack[x] = y.tolist()
+    return result
+
+
+def read_data_mult(file: str, x_index: int, y_index_start: int, y_index_end: int,
+                   z_index: int, z_zero: int) -> dict[int, dict]:
+    """
+    Read multiple data dicts from a file.
+
+    :param file: Input file
+    :param x_index: Index of X column
+    :param y_index: [optional] Index of Y column
+    :param z_index: The index of the different curves
+    :param z_zero: Index of values that have to be zero
+    :return: Dict of dicts in following Format:
+    X-values as keys, Y-values as List, even if there is only one.
+    {
+        z1:{
+            x1: [y1, y2, y3],
+            x2: [y4],
+            x3. [y5, y6]
+        },
+        z2:{
+            x1: [y1, y2, y3],
+            x2: [y4],
+            x3. [y5, y6]
+        }
+    }
+    """
+    with open(file, "r", encoding='utf-8') as fd:
+        lines = fd.readlines()
+    lines = remove_head(lines)
+
+    # Read out data
+    result = {}
+    for line in lines:
+        values = line.split(";")
+        if int(values[z_zero]):
+            continue
+        x = int(values[x_index])
+        y = float(values[y_index_end]) - float(values[y_index_start])
+        z = int(values[z_index])
+        if z not in result:
+            result[z] = {}
+        if x in result[z]:
+            result[z][x].append(y)
+        else:
+            result[z][x] = [y]
+    return result
+
+
+def read_ram(file: str, x_index: int, y_index: int = -1) -> dict:
+    """
+    Read maximal ram value for each x.
+    :param file: Input file
+    :param x_index: Index of X column
+    :param y_index: [optional] Index of Y column
+    :param x_is_float: [optional] x is interpreted as float instead of int
+    :return: Dict in following Format:
+    X-values as keys, Y-values as List, even if there is only one.
+    {
+        x1: [y1, y2, y3],
+        x2: [y4],
+        x3. [y5, y6]
+    }
+    """
+    with open(file, "r", encoding='utf-8') as fd:
+        lines = fd.readlines()
+    lines = remove_head(lines)
+
+    # Read out data
+    result = {}
+    for line in lines:
+        values = line.split(";")
+        x = int(values[x_index])
+        ram_value = json.loads(values[y_index])
+        y = float(ram_value[0])
+        if x in result:
+            result[x].append(y)
+        else:
+            result[x] = [y]
+    return result
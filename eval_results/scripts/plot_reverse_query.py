@@ -9,13 +9,18 @@ E-mail: joseph.leisten@rwth-aachen.de
 
 import os
 
+import numpy as np
+
 from eval_results.scripts.plot.colors import (maroon, red, yellow, purple, pink, blue, green,orange)
-from eval_results.scripts.plot.plotter import (INPUT_DIR, OUTPUT_DIR, EXTENSION, Line2D,
-                                               Legend, plot_settings, read_data,
-                                               convert_to_mb, convert_to_min, stacked_bar_plot_line)
+from eval_results.scripts.plot.plotter import (OUTPUT_DIR, EXTENSION, Legend,
+                                               make_line_labels, plot_settings,
+                                               stacked_bar_plot_line)
+from eval_results.scripts.plot.reader import INPUT_DIR, read_stacks
 
 
 X_INDEX = 2
+SECONDS_PER_MIN = 60
+BYTES_PER_MB = 1000000
 SYNTHETIC = True
 
 input_dir = INPUT_DIR + "reverse_query/"
@@ -26,77 +31,36 @@ if SYNTHETIC:
     diff = True
     phases = ["Key Retrieval", "Point Retrieval",
               "Obfuscation", "Decryption"]
+    line_phases = ["To Key Server", "From Key Server",
+                   "To Map Server", "From Map Server"]
     colors = [maroon, green, purple, pink]
     line_colors = [yellow, orange, red, blue]
     r_indices = [5, 6, 7, 8]
     line_indices = [11, 9, 15, 13]
 
 
-def subtract_prev(stack_lst: list[dict]) -> list[dict]:
-    """Subtract the previous time."""
-    for i in range(len(stack_lst) - 1, 0, -1):
-        data = stack_lst[i]
-        for p in data.keys():
-            for j, t in enumerate(data[p]):
-                data[p][j] = t - stack_lst[i-1][p][j]
-    return stack_lst
-
-
-def get_stacks_tc(file: str, x_index: int, y_index: int = -1) -> dict:
-    """Get stacks without traffic control."""
-    with open(file, "r", encoding='utf-8') as fd:
-        lines = fd.readlines()
-    found = False
-    i = 0
-    while not found:
-        if "END HEADER" in lines[i]:
-            found = True
-        else:
-            i += 1
-    lines = lines[i + 1:]
-
-    result = {}
-    for line in lines:
-        values = line.split(";")
-        if int(values[3]) or int(values[4]):
-            continue
-        x = int(values[x_index])
-        y = float(values[y_index])
-        if x in result:
-            result[x].append(y)
-        else:
-            result[x] = [y]
-    return result
-
-
-def get_stacks(input_file: str, indices: list[int], tc: bool = False) -> list[dict]:
-    """Get stacks."""
-    stacks = []
-    for i in indices:
-        d = read_data(input_file, X_INDEX, i)
-        if tc:
-            d = get_stacks_tc(input_file, X_INDEX, i)
-        stacks.append(d)
-    if diff:
-        stacks = subtract_prev(stacks)
-        del stacks[0]
-    return stacks
+def get_stacks(input_file: str, indices: list[int], tc: bool = False,
+               scale: float = 1) -> list[dict]:
+    """Get stacks divided by scale (only rows without traffic control if tc is set)."""
+    zero_indices = [3, 4] if tc else None
+    return read_stacks(input_file, X_INDEX, indices, diff, zero_indices, scale)
 
 
 if SYNTHETIC:
-    r_stacks = get_stacks(input_dir + "reverse_r_invalid.csv", r_indices, True)
-    regular_stacks = get_stacks(INPUT_DIR + "regular_query/regular_1_r_invalid.csv", [4, 5])
+    r_stacks = get_stacks(input_dir + "reverse_r_invalid.csv", r_indices, True,
+                          SECONDS_PER_MIN)
+    regular_stacks = get_stacks(INPUT_DIR + "regular_query/regular_1_r_invalid.csv", [4, 5],
+                                scale=SECONDS_PER_MIN)
     for i in range(1, 4):
-        for j in range(30):
-            k = i * 2000
-            r_stacks[1][i][j] -= regular_stacks[0][k][j]
+        r_stacks[1][i] = (np.asarray(r_stacks[1][i])
+                          - np.asarray(regular_stacks[0][i * 2000])).tolist()
     r_stacks.insert(1, dict([(1, regular_stacks[0][2000]),
                              (2, regular_stacks[0][4000]),
                              (3, regular_stacks[0][6000])]))
-    data_list = [[convert_to_min(stack) for stack in r_stacks]]
+    data_list = [r_stacks]
 
     diff = False
-    line_1_stacks = get_stacks(input_dir + "reverse_r_invalid.csv", line_indices)
+    line_1_stacks = get_stacks(input_dir + "reverse_r_invalid.csv", line_indices, scale=BYTES_PER_MB)
     line_stacks_tks = dict([(0, line_1_stacks[0][1]),
                             (1, line_1_stacks[0][2]),
                             (2, line_1_stacks[0][3])])
@@ -110,13 +74,8 @@ if SYNTHETIC:
                             (1, line_1_stacks[3][2]),
                             (2, line_1_stacks[3][3])])
     line_list = [line_stacks_tks, line_stacks_fks, line_stacks_tms, line_stacks_fms]
-    line_list = [convert_to_mb(stack) for stack in line_list]
 
-    tks_label = (Line2D([0], [0], color=line_colors[0], lw=1), "To Key Server")
-    fks_label = (Line2D([0], [0], color=line_colors[1], lw=1), "From Key Server")
-    tms_label = (Line2D([0], [0], color=line_colors[2], lw=1), "To Map Server")
-    fms_label = (Line2D([0], [0], color=line_colors[3], lw=1), "From Map Server")
-    line_labels = [tks_label, fks_label, tms_label, fms_label]
+    line_labels = make_line_labels(line_colors, line_phases)
 
     with plot_settings(half_width=True):
         stacked_bar_plot_line(filename=output_dir + f"reverse{EXTENSION}",
@@ -7,9 +7,10 @@ Author: Joseph Leisten
 E-mail: joseph.leisten@rwth-aachen.de
 """
 
-from eval_results.scripts.plot.plotter import (INPUT_DIR, remove_head,
-                                               mean_confidence_interval)
-from src.lib import config
+import numpy as np
+
+from eval_results.scripts.plot.reader import (INPUT_DIR, remove_head,
+                                              mean_confidence_intervals)
 
 
 input_file = INPUT_DIR + "paillier/paillier.csv"
@@ -17,7 +18,8 @@ with open(input_file, "r", encoding='utf-8') as fd:
     lines = fd.readlines()
 lines = remove_head(lines)
 
-for i in range(7):
-    j = i * 32
-    data = [float(line.split(';')[1]) for line in lines[1+j : 31+j]]
-    print(mean_confidence_interval(data))
+# One row of set durations per phase
+data_lines = [line for line in lines if line[:1].isdigit()]
+data = np.loadtxt(data_lines, delimiter=';', usecols=1).reshape(7, -1)
+for m, h in zip(*mean_confidence_intervals(data)):
+    print((float(m), h))
@@ -12,6 +12,7 @@ import logging
 import os
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 from phe import paillier
 
@@ -26,99 +27,120 @@ log = configure_root_logger(logging.INFO, config.DATA_DIR + 'paillier.log')
 # -----------------------------------------------------------------------------
 
 
-def write_header(file_path: str, reps: int, row_fmt: str):
+def write_header(file_path: str, reps: int, row_fmt: str, jobs: int = 1):
     """Write header into csv file."""
     with open(file_path, 'w', encoding='utf-8') as fd:
         fd.write("---------------------BEGIN HEADER---------------------\n")
         fd.write(f"Key Length: {config.KEY_LEN}\n")
         fd.write(f"Sets: {config.SETS}\n")
         fd.write(f"Reps: {reps}\n")
+        fd.write(f"Key Generation Processes: {jobs}\n")
         fd.write(f"{row_fmt}\n")
         fd.write("----------------------END HEADER----------------------\n")
 
 
-def main(base_filename: str, reps: int, resume: bool = False):
-    """Execute evaluation."""
+def _gen_keypair(n_length: int) -> None:
+    """Generate one key pair, used as worker for parallel key generation."""
+    paillier.generate_paillier_keypair(n_length=n_length)
+
+
+def main(base_filename: str, reps: int, resume: bool = False, jobs: int = 1):
+    """
+    Execute evaluation.
+
+    :param jobs: Number of processes for key generation. With more than one
+        process the duration is the wall time of all reps, not the sum of
+        per-operation latencies.
+    """
     file_path = DIRECTORY + base_filename + ".csv"
     if not resume or not os.path.exists(file_path):
         row_fmt = "SET;DURATION"
-        write_header(file_path, reps, row_fmt)
+        write_header(file_path, reps, row_fmt, jobs)
     public_key, private_key = paillier.generate_paillier_keypair(n_length=config.KEY_LEN)
-
+    # Operands are not mutated by the benchmarked operations
+    enc_13 = public_key.encrypt(13)
+    ct_13 = enc_13.ciphertext()
+
+    # Rows are only written after each phase to keep file I/O out of the sets
+    rows = []
+    if jobs > 1:
+        chunksize = max(1, reps // (4 * jobs))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for s in lb(range(config.SETS), "Sets", position=0):
+                start = time.monotonic()
+                list(executor.map(_gen_keypair, [config.KEY_LEN] * reps,
+                                  chunksize=chunksize))
+                duration = time.monotonic() - start
+                rows.append(f"{s};{duration}\n")
+    else:
+        for s in lb(range(config.SETS), "Sets", position=0):
+            start = time.monotonic()
+            for r in lb(range(reps), "Repetitions", leave=False):
+                paillier.generate_paillier_keypair(n_length=config.KEY_LEN)
+            duration = time.monotonic() - start
+            rows.append(f"{s};{duration}\n")
     with open(file_path, "a", encoding='utf-8') as fd:
-        fd.write("Key Generation\n")
-    for s in lb(range(config.SETS), "Sets", position=0):
-        start = time.monotonic()
-        for r in lb(range(reps), "Repetitions", leave=False):
-            paillier.generate_paillier_keypair(n_length=config.KEY_LEN)
-        duration = time.monotonic() - start
-        with open(file_path, "a", encoding='utf-8') as fd:
-            fd.write(f"{s};{duration}\n")
+        fd.write("Key Generation\n" + "".join(rows))
 
-    with open(file_path, "a", encoding='utf-8') as fd:
-        fd.write("\nEncryption\n")
+    rows = []
     for s in lb(range(config.SETS), "Sets", position=0):
         start = time.monotonic()
         for r in lb(range(reps), "Repetitions", leave=False):
             public_key.encrypt(13)
         duration = time.monotonic() - start
-        with open(file_path, "a", encoding='utf-8') as fd:
-            fd.write(f"{s};{duration}\n")
-
+        rows.append(f"{s};{duration}\n")
     with open(file_path, "a", encoding='utf-8') as fd:
-        fd.write("\nCiphertext Extraction\n")
+        fd.write("\nEncryption\n" + "".join(rows))
+
+    rows = []
     for s in lb(range(config.SETS), "Sets", position=0):
-        enc_13 = public_key.encrypt(13)
         start = time.monotonic()
         for r in lb(range(reps), "Repetitions", leave=False):
             enc_13.ciphertext()
         duration = time.monotonic() - start
-        with open(file_path, "a", encoding='utf-8') as fd:
-            fd.write(f"{s};{duration}\n")
-
+        rows.append(f"{s};{duration}\n")
     with open(file_path, "a", encoding='utf-8') as fd:
-        fd.write("\nEncryptedNumber Generation\n")
+        fd.write("\nCiphertext Extraction\n" + "".join(rows))
+
+    rows = []
     for s in lb(range(config.SETS), "Sets", position=0):
-        ct_13 = public_key.encrypt(13).ciphertext()
         start = time.monotonic()
         for r in lb(range(reps), "Repetitions", leave=False):
             paillier.EncryptedNumber(public_key, ct_13)
         duration = time.monotonic() - start
-        with open(file_path, "a", encoding='utf-8') as fd:
-            fd.write(f"{s};{duration}\n")
-
+        rows.append(f"{s};{duration}\n")
     with open(file_path, "a", encoding='utf-8') as fd:
-        fd.write("\nPlaintext Addition\n")
+        fd.write("\nEncryptedNumber Generation\n" + "".join(rows))
+
+    rows = []
     for s in lb(range(config.SETS), "Sets", position=0):
-        enc_13 = public_key.encrypt(13)
         start = time.monotonic()
         for r in lb(range(reps), "Repetitions", leave=False):
             enc_13 + 13
         duration = time.monotonic() - start
-        with open(file_path, "a", encoding='utf-8') as fd:
-            fd.write(f"{s};{duration}\n")
-
+        rows.append(f"{s};{duration}\n")
     with open(file_path, "a", encoding='utf-8') as fd:
-        fd.write("\nCiphertext Addition\n")
+        fd.write("\nPlaintext Addition\n" + "".join(rows))
+
+    rows = []
     for s in lb(range(config.SETS), "Sets", position=0):
-        enc_13 = public_key.encrypt(13)
         start = time.monotonic()
         for r in lb(range(reps), "Repetitions", leave=False):
             enc_13 + enc_13
         duration = time.monotonic() - start
-        with open(file_path, "a", encoding='utf-8') as fd:
-            fd.write(f"{s};{duration}\n")
-
+        rows.append(f"{s};{duration}\n")
     with open(file_path, "a", encoding='utf-8') as fd:
-        fd.write("\nDecryption\n")
+        fd.write("\nCiphertext Addition\n" + "".join(rows))
+
+    rows = []
     for s in lb(range(config.SETS), "Sets", position=0):
-        enc_13 = public_key.encrypt(13)
         start = time.monotonic()
         for r in lb(range(reps), "Repetitions", leave=False):
             private_key.decrypt(enc_13)
         duration = time.monotonic() - start
-        with open(file_path, "a", encoding='utf-8') as fd:
-            fd.write(f"{s};{duration}\n")
+        rows.append(f"{s};{duration}\n")
+    with open(file_path, "a", encoding='utf-8') as fd:
+        fd.write("\nDecryption\n" + "".join(rows))
 
 
 def get_paillier_parser() -> argparse.ArgumentParser:
@@ -131,10 +153,12 @@ def get_paillier_parser() -> argparse.ArgumentParser:
                         required=True)
     parser.add_argument('-r', '--reps', help="Number of repetitions.",
                         default=1000, type=int)
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Number of processes for key generation.")
     return parser
 
 
 if __name__ == '__main__':
     parser = get_paillier_parser()
     args = parser.parse_args()
-    main(args.out, args.reps, args.resume)
+    main(args.out, args.reps, args.resume, args.jobs)
@@ -13,11 +13,9 @@ import contextlib
 import json
 import logging
 import os
-import pickle
 import shutil
 import subprocess
 import sys
-import time
 
 from src.eval import shared as shd
 from src.eval.shared import lb
@@ -29,38 +27,54 @@ from src.producer import Producer
 
 # Constants -------------------------------------------------------------------
 SLEEP_TIME = 10
+START_ATTEMPTS = 5
 MAP_NAME = ('5rLhPSFu', 'hardened steel', 'zJcgKqGI')
 TOOL_PROPERTIES = ('end mill', 4)
-DIRECTORY = config.EVAL_DIR + "provision" + "/"
+DIRECTORY = os.path.join(config.EVAL_DIR, "provision", "")
 os.makedirs(DIRECTORY, exist_ok=True)
+KEY_DB_PATH = os.path.join(config.DATA_DIR, config.KEY_DB)
+MAP_DB_PATH = os.path.join(config.DATA_DIR, config.MAP_DB)
 NUM_POINTS = [2000, 4000, 6000]
 STORED_VALUES = 0
 PAILLIER = True
 TLS = True
 RAM = True
-log = configure_root_logger(logging.INFO, config.DATA_DIR + 'provision.log')
-atexit.register(shutil.rmtree, config.TEMP_DIR, True)
-atexit.register(shd.set_eval, config.EVAL)
-atexit.register(shd.reset_config)
+NET = True
+# Measurements taken from the producer's com file, in CSV column order
+COM_KEYS_START = ('start_time_file', 'parsed_record_time', 'start_time',
+                  'provider_key_retrieval_time')
+COM_KEYS_PAILLIER = COM_KEYS_START + ('comparison_request_time',
+                                      'comparison_time', 'encryption_time',
+                                      'provision_time')
+# plaintext only in name
+COM_KEYS_INVALID = COM_KEYS_START + ('encryption_time',
+                                     'plaintext_provision_time')
+COM_KEYS_PLAIN = COM_KEYS_START + ('plaintext_provision_time',)
+log = configure_root_logger(logging.INFO, config.DATA_DIR + 'provision.log',
+                            queued=True)
 # -----------------------------------------------------------------------------
 
 
 def write_header(file_path: str, row_fmt: str) -> None:
     """Write header into csv file."""
+    lines = [
+        "---------------------BEGIN HEADER---------------------",
+        f"Stored Values: {STORED_VALUES}",
+        f"Paillier Status: {PAILLIER}",
+        f"TLS Status: {TLS}",
+        f"RAM Status: {RAM}",
+        f"Network Status: {NET}",
+        f"Key Length: {config.KEY_LEN}",
+        f"Sets: {config.SETS}",
+        f"Interval of RAM measurements: {config.RAM_INTERVAL}s",
+        "",
+        "All times in seconds! Timer is monotonic clock and starts "
+        "with 'StartTime'. Only differences are meaningful.",
+        row_fmt,
+        "----------------------END HEADER----------------------",
+    ]
     with open(file_path, 'w', encoding='utf-8') as fd:
-        fd.write("---------------------BEGIN HEADER---------------------\n")
-        fd.write(f"Stored Values: {STORED_VALUES}\n")
-        fd.write(f"Paillier Status: {PAILLIER}\n")
-        fd.write(f"TLS Status: {TLS}\n")
-        fd.write(f"RAM Status: {RAM}\n")
-        fd.write(f"Key Length: {config.KEY_LEN}\n")
-        fd.write(f"Sets: {config.SETS}\n")
-        fd.write(f"Interval of RAM measurements: {config.RAM_INTERVAL}s\n")
-        fd.write("\n")
-        fd.write("All times in seconds! Timer is monotonic clock and starts "
-                 "with 'StartTime'. Only differences are meaningful.\n")
-        fd.write(f"{row_fmt}\n")
-        fd.write("----------------------END HEADER----------------------\n")
+        fd.write("\n".join(lines) + "\n")
 
 
 def kill_bg_servers() -> None:
@@ -69,28 +83,35 @@ def kill_bg_servers() -> None:
                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 
-atexit.register(kill_bg_servers)
+def cleanup() -> None:
+    """Stop servers, restore config and remove temporary files on exit."""
+    kill_bg_servers()
+    shd.reset_config()
+    shd.set_eval(config.EVAL)
+    shutil.rmtree(config.TEMP_DIR, ignore_errors=True)
+
+
+atexit.register(cleanup)
 
 
-def preparation(file: str, p: int, record_file: str = None) -> None:
+def preparation(file: str, p: int, prov: Producer,
+                record_file: str = None) -> None:
     """
     Prepare databases and start background tasks.
     
     :param file: Name of file to write generated points to
     :param p: Number of points
+    :param prov: Provider to check servers and store existing values with
     :param record: Name of file containing record (for real-world eval only)
     """
     # Kill old processes if running
     kill_bg_servers()
-    time.sleep(SLEEP_TIME)
-
-    data_dir = config.DATA_DIR
+    shd.wait_for_servers_stopped("eval", SLEEP_TIME)
 
     log.info("Removing Databases.")
-    with contextlib.suppress(FileNotFoundError):
-        # Remove Databases
-        os.remove(data_dir + config.KEY_DB)
-        os.remove(data_dir + config.MAP_DB)
+    shd.remove_databases()
+    # Tokens were stored in the removed databases
+    prov.spare_tokens.clear()
 
     # Add User
     log.info("Prepare User DB.")
@@ -99,27 +120,29 @@ def preparation(file: str, p: int, record_file: str = None) -> None:
 
     log.info("Starting Background Servers.")
     subprocess.run([f"{config.WORKING_DIR}src/startServers.sh", "eval"])
-    time.sleep(SLEEP_TIME)
-
-    # Create provider
-    prov = Producer('pastprov')
-    prov.set_password('password')
 
     # Check that servers are really online
-    while True:
+    timeout = SLEEP_TIME
+    for attempt in range(START_ATTEMPTS):
         try:
-            # Check Key Server
-            prov.get_token(ServerType.KeyServer)
+            # Wait for ports to open, then check that servers answer
+            shd.wait_for_servers(timeout)
+            # Check Key Server, token is kept for later requests
+            prov.prefetch_token(ServerType.KeyServer)
             # Check Map Server
-            prov.get_token(ServerType.MapServer)
+            prov.prefetch_token(ServerType.MapServer)
             # Success
             break
         except Exception as e:
-            log.error(f"Server not up yet. Error: {str(e)}")
+            log.error(f"Server not up yet (attempt {attempt + 1}). Error: {str(e)}")
             kill_bg_servers()
-            time.sleep(SLEEP_TIME)
-            subprocess.run([f"{config.WORKING_DIR}src/startServers.sh", "eval"])
-            time.sleep(2 * SLEEP_TIME)
+            shd.wait_for_servers_stopped("eval", SLEEP_TIME)
+            if attempt + 1 < START_ATTEMPTS:
+                subprocess.run([f"{config.WORKING_DIR}src/startServers.sh", "eval"])
+                timeout *= 2
+    else:
+        raise RuntimeError(
+            f"Servers did not start within {START_ATTEMPTS} attempts.")
 
     shd.gen_points(MAP_NAME, TOOL_PROPERTIES, file, p)
     if STORED_VALUES:
@@ -134,7 +157,7 @@ def start(file: str, com_file: str) -> subprocess.Popen:
     :param com_file: Communication file
     :return: Created process
     """
-    cmd = ["python3", "src/producer.py", "testprod", "password",
+    cmd = [sys.executable, "src/producer.py", "testprod", "password",
            "-f", file, "-e", com_file]
     proc = subprocess.Popen(cmd, universal_newlines=True,
                             stderr=subprocess.PIPE)
@@ -144,8 +167,8 @@ def start(file: str, com_file: str) -> subprocess.Popen:
 def main(base_filename: str, resume: bool = False,
          invalid: bool = False, real: bool = False):
     """Execute evaluation."""
-    file_path = DIRECTORY + base_filename + ".csv"
-    ram_path = DIRECTORY + base_filename + "_ram.csv"
+    file_path = os.path.join(DIRECTORY, f"{base_filename}.csv")
+    ram_path = os.path.join(DIRECTORY, f"{base_filename}_ram.csv")
     if not resume or not os.path.exists(file_path):
         if PAILLIER and not invalid:
             row_fmt = ("TIMESTAMP;"
@@ -200,9 +223,8 @@ def main(base_filename: str, resume: bool = False,
         if RAM:
             row_fmt = "TIMESTAMP;SET;#Points;json.dumps(ram_usage)"
             write_header(ram_path, row_fmt)
-    shd.set_paillier(PAILLIER)
-    shd.set_tls(TLS)
-    shd.set_ram(RAM)
+    shd.set_config_many({'USE_PAILLIER': PAILLIER, 'USE_TLS': TLS,
+                         'MEASURE_RAM': RAM})
     points = NUM_POINTS
     if invalid:
         shd.set_valid(False)
@@ -210,177 +232,121 @@ def main(base_filename: str, resume: bool = False,
     if real:
         record_file = config.WORKING_DIR + "data/real_world_record.txt"
         points = [30]
+    if PAILLIER and not invalid:
+        com_keys = COM_KEYS_PAILLIER
+    elif PAILLIER and invalid:
+        com_keys = COM_KEYS_INVALID
+    else:
+        com_keys = COM_KEYS_PLAIN
+
+    # Provider is reused for all preparations
+    prov = Producer('pastprov')
+    prov.set_password('password')
 
-    for s in lb(range(config.SETS), "Sets", position=0):
-        for p in lb(points, "Number of Points", leave=False):
-            log.info("Preparing...")
-            provision_file = helpers.get_temp_file() + "_provision.txt"
-            preparation(provision_file, p)
-            if real:
-                provision_file = record_file
-            success = False
-            while not success:
-                process = None
-                com_file = helpers.get_temp_file() + '_comfile.pyc'
-                e = None
-                # May be deleted by clean-up of prev. round
-                os.makedirs(config.TEMP_DIR, exist_ok=True)
+    # Keep result files open for the whole evaluation, rows are flushed per set
+    with contextlib.ExitStack() as stack:
+        csv_fd = stack.enter_context(open(file_path, "a", encoding='utf-8'))
+        if RAM:
+            ram_fd = stack.enter_context(open(ram_path, "a", encoding='utf-8'))
+        for s in lb(range(config.SETS), "Sets", position=0):
+            for p in lb(points, "Number of Points", leave=False):
+                log.info("Preparing...")
+                provision_file = helpers.get_temp_file() + "_provision.txt"
+                temp_files = [provision_file]
                 try:
-                    error = ""
-                    # Start data measurements
-                    tks, tks_file = helpers.start_trans_measurement(
-                        config.KEY_API_PORT, direction="dst", sleep=False
-                    )
-                    fks, fks_file = helpers.start_trans_measurement(
-                        config.KEY_API_PORT, direction="src", sleep=False
-                    )
-                    tms, tms_file = helpers.start_trans_measurement(
-                        config.MAP_API_PORT, direction="dst", sleep=False
-                    )
-                    fms, fms_file = helpers.start_trans_measurement(
-                        config.MAP_API_PORT, direction="src", sleep=False
-                    )
-                    measurements = [tks, fks, tms, fms]
-                    time.sleep(0.5)
-
-                    process = start(provision_file, com_file)
-                    process.wait()
-
-                    # Load com file
-                    with open(com_file, "rb") as fd:
-                        e = pickle.load(fd)
-                    if e['error'] is not None:
-                        raise RuntimeError(e['error'])
-                    ram_usage = e['ram_usage']
-
-                    # Kill TCPDUMP
-                    helpers.kill_tcpdump()
-                    for proc in measurements:
-                        # Wait for termination
-                        proc.wait()
-
-                    # Get Data Amount results
-                    fks_byte, fks_pkt = helpers.read_tcpstat_from_file(
-                        fks_file)
-                    tks_byte, tks_pkt = helpers.read_tcpstat_from_file(
-                        tks_file)
-                    fms_byte, fms_pkt = helpers.read_tcpstat_from_file(
-                        fms_file)
-                    tms_byte, tms_pkt = helpers.read_tcpstat_from_file(
-                        tms_file)
-
-                    # Get size of databases
-                    ks_size = os.path.getsize(config.DATA_DIR + config.KEY_DB)
-                    ms_size = os.path.getsize(config.DATA_DIR + config.MAP_DB)
-
-                    if PAILLIER and not invalid:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ';'.join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time_file']),
-                                str(e['parsed_record_time']),
-                                str(e['start_time']),
-                                str(e['provider_key_retrieval_time']),
-                                str(e['comparison_request_time']),
-                                str(e['comparison_time']),
-                                str(e['encryption_time']),
-                                str(e['provision_time']),
-                                str(ks_size),
-                                str(ms_size),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(
-                                f"{row}\n")
-                    elif PAILLIER and invalid:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ';'.join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time_file']),
-                                str(e['parsed_record_time']),
-                                str(e['start_time']),
-                                str(e['provider_key_retrieval_time']),
-                                str(e['encryption_time']),
-                                str(e['plaintext_provision_time']), # plaintext only in name
-                                str(ks_size),
-                                str(ms_size),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(
-                                f"{row}\n")
-                    else:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ';'.join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time_file']),
-                                str(e['parsed_record_time']),
-                                str(e['start_time']),
-                                str(e['provider_key_retrieval_time']),
-                                str(e['plaintext_provision_time']),
-                                str(ks_size),
-                                str(ms_size),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(
-                                f"{row}\n")
-                    if RAM:
-                        with open(ram_path, "a", encoding='utf-8') as fd:
-                            fd.write(
-                                ';'.join(
-                                    (
-                                        time.strftime('%Y-%m-%d %H:%M:%S'),
-                                        str(s),
-                                        str(p),
-                                        json.dumps(ram_usage)
-                                    )
-                                ) + '\n'
-                            )
-                    success = True
-                except Exception as e:
-                    log.exception(str(e))
-                    success = False
-                finally:
-                    # Clean Up
-                    if process is not None:
-                        process.terminate()
-                        try:
-                            process.wait(5)
-                        except subprocess.TimeoutExpired:
-                            # Terminate was not enough
-                            process.kill()
-                    # Kill TCPDUMP
-                    helpers.kill_tcpdump()
-            # Remove Tempfiles
-            shutil.rmtree(config.TEMP_DIR, ignore_errors=True)
+                    preparation(provision_file, p, prov)
+                except RuntimeError as e:
+                    log.exception(f"Skipping set {s} with {p} points: {str(e)}")
+                    shd.remove_files(temp_files)
+                    continue
+                if real:
+                    provision_file = record_file
+                success = False
+                while not success:
+                    process = None
+                    com_file = helpers.get_temp_file() + '_comfile.json'
+                    temp_files.append(com_file)
+                    e = None
+                    try:
+                        error = ""
+                        # Start data measurements
+                        if NET:
+                            measurements, measurement_files = \
+                                shd.start_server_measurements()
+                            temp_files.extend(measurement_files)
+                            shd.wait_for_pcap_files(measurement_files)
+
+                        process = start(provision_file, com_file)
+                        process.wait()
+
+                        # Load com file
+                        with open(com_file, "r", encoding='utf-8') as com_fd:
+                            e = json.load(com_fd)
+                        if e['error'] is not None:
+                            raise RuntimeError(e['error'])
+                        ram_usage = e['ram_usage_json']
+
+                        if NET:
+                            # Kill TCPDUMP
+                            helpers.kill_tcpdump()
+                            for proc in measurements:
+                                # Wait for termination
+                                proc.wait()
+
+                            # Get Data Amount results
+                            ((tks_byte, tks_pkt), (fks_byte, fks_pkt),
+                             (tms_byte, tms_pkt), (fms_byte, fms_pkt)) = \
+                                shd.read_server_measurements(measurement_files)
+                        else:
+                            tks_byte = tks_pkt = fks_byte = fks_pkt = 0
+                            tms_byte = tms_pkt = fms_byte = fms_pkt = 0
+
+                        # Get size of databases
+                        ks_size = shd.db_size(KEY_DB_PATH)
+                        ms_size = shd.db_size(MAP_DB_PATH)
+
+                        row = ';'.join((
+                            shd.timestamp(),
+                            str(s),
+                            str(p),
+                            *(str(e[k]) for k in com_keys),
+                            str(ks_size),
+                            str(ms_size),
+                            str(fks_byte),
+                            str(fks_pkt),
+                            str(tks_byte),
+                            str(tks_pkt),
+                            str(fms_byte),
+                            str(fms_pkt),
+                            str(tms_byte),
+                            str(tms_pkt),
+                            error
+                        ))
+                        csv_fd.write(f"{row}\n")
+                        if RAM:
+                            ram_fd.write(f"{shd.timestamp()};{s};{p};"
+                                         f"{ram_usage}\n")
+                        success = True
+                    except Exception as e:
+                        log.exception(str(e))
+                        success = False
+                    finally:
+                        # Clean Up
+                        if process is not None:
+                            process.terminate()
+                            try:
+                                process.wait(5)
+                            except subprocess.TimeoutExpired:
+                                # Terminate was not enough
+                                process.kill()
+                        # Kill TCPDUMP
+                        if NET:
+                            helpers.kill_tcpdump()
+                # Remove Tempfiles
+                shd.remove_files(temp_files)
+            csv_fd.flush()
+            if RAM:
+                ram_fd.flush()
 
 
 
@@ -405,6 +371,9 @@ def get_provision_parser() -> argparse.ArgumentParser:
                         action="store_false", default=True)
     parser.add_argument('-r', "--ram", help="Deactivate RAM measurement.",
                         action="store_false", default=True)
+    parser.add_argument('-n', "--no-net", dest='net',
+                        help="Deactivate measurement of transmitted data.",
+                        action="store_false", default=True)
     return parser
 
 
@@ -418,4 +387,5 @@ if __name__ == '__main__':
     PAILLIER = args.paillier
     TLS = args.tls
     RAM = args.ram
+    NET = args.net
     main(args.out, args.resume, args.invalid, args.real)
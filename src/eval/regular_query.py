@@ -13,23 +13,23 @@ import contextlib
 import json
 import logging
 import os
-import pickle
 import shutil
 import subprocess
 import sys
-import time
+from typing import TYPE_CHECKING, TextIO
 
 from src.eval import shared as shd
 from src.eval.shared import lb
 from src.lib import config, helpers
-from src.lib import db_cli as db
 from src.lib.logging import configure_root_logger
-from src.lib.user import UserType, ServerType
-from src.producer import Producer
+
+if TYPE_CHECKING:
+    from src.producer import Producer
 
 
 # Constants -------------------------------------------------------------------
 SLEEP_TIME = 10
+START_ATTEMPTS = 5
 MAP_NAME = ('5rLhPSFu', 'hardened steel', 'zJcgKqGI')
 TOOL_PROPERTIES = ('end mill', 4)
 DIRECTORY = config.EVAL_DIR + "regular_query" + "/"
@@ -39,10 +39,52 @@ STORED_VALUES = 0
 PAILLIER = True
 TLS = True
 RAM = True
-log = configure_root_logger(logging.INFO, config.DATA_DIR + 'regular_query.log')
-atexit.register(shutil.rmtree, config.TEMP_DIR, True)
-atexit.register(shd.set_eval, config.EVAL)
-atexit.register(shd.reset_config)
+# Measurements taken from the client's com file, in CSV column order
+COM_KEYS_START = ('start_time', 'client_key_retrieval_time')
+COM_KEYS_PAILLIER = COM_KEYS_START + ('comparison_request_time',
+                                      'comparison_time',
+                                      'point_retrieval_time',
+                                      'point_decryption_time')
+COM_KEYS_INVALID = COM_KEYS_START + ('plaintext_point_retrieval_time',
+                                     'point_decryption_time')
+COM_KEYS_PLAIN = COM_KEYS_START + ('plaintext_point_retrieval_time',)
+# Columns of result rows, keyed by (PAILLIER, invalid)
+ROW_FMT_START = ("TIMESTAMP;"
+                 "SET;"
+                 "#Points;"
+                 "StartTime[s];"
+                 "ClientKeyRetrievalTime[s];")
+ROW_FMT_END = ("FromKS[Byte];FromKS[Pkt];"
+               "ToKS[Byte];ToKs[Pkt];"
+               "FromMS[Byte];FromMS[Pkt];"
+               "ToMS[Byte];ToMS[Pkt];"
+               "Error")
+ROW_FMT_PAILLIER = (ROW_FMT_START +
+                    "ComparisonRequestTime[s];"
+                    "ComparisonTime[s];"
+                    "PointRetrievalTime[s];"
+                    "PointDecryptionTime[s];" +
+                    ROW_FMT_END)
+ROW_FMT_INVALID = (ROW_FMT_START +
+                   "PointRetrievalTime[s];"
+                   "PointDecryptionTime[s];" +
+                   ROW_FMT_END)
+ROW_FMT_PLAIN = (ROW_FMT_START +
+                 "PlaintextPointRetrievalTime[s];" +
+                 ROW_FMT_END)
+ROW_FMTS = {
+    (True, False): ROW_FMT_PAILLIER,
+    (True, True): ROW_FMT_INVALID,
+    (False, False): ROW_FMT_PLAIN,
+    (False, True): ROW_FMT_PLAIN,
+}
+ROW_COM_KEYS = {
+    (True, False): COM_KEYS_PAILLIER,
+    (True, True): COM_KEYS_INVALID,
+    (False, False): COM_KEYS_PLAIN,
+    (False, True): COM_KEYS_PLAIN,
+}
+log = logging.getLogger(__name__)
 # -----------------------------------------------------------------------------
 
 
@@ -70,26 +112,24 @@ def kill_bg_servers() -> None:
                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 
-atexit.register(kill_bg_servers)
-
-
-def preparation(p: int, real: bool = False) -> None:
+def preparation(p: int, prov: 'Producer', real: bool = False) -> None:
     """
     Prepare databases and start background tasks.
 
     :param p: Number of points
+    :param prov: Provider to check servers and store points with
     """
+    from src.lib import db_cli as db
+    from src.lib.user import UserType, ServerType
+
     # Kill old processes if running
     kill_bg_servers()
-    time.sleep(SLEEP_TIME)
-
-    data_dir = config.DATA_DIR
+    shd.wait_for_servers_stopped("eval", SLEEP_TIME)
 
     log.info("Removing Databases.")
-    with contextlib.suppress(FileNotFoundError):
-        # Remove Databases
-        os.remove(data_dir + config.KEY_DB)
-        os.remove(data_dir + config.MAP_DB)
+    shd.remove_databases()
+    # Tokens were stored in the removed databases
+    prov.spare_tokens.clear()
 
     # Add User
     log.info("Prepare User DB.")
@@ -98,405 +138,200 @@ def preparation(p: int, real: bool = False) -> None:
 
     log.info("Starting Background Servers.")
     subprocess.run([f"{config.WORKING_DIR}src/startServers.sh", "eval"])
-    time.sleep(SLEEP_TIME)
-
-    # Create provider
-    prov = Producer('pastprov')
-    prov.set_password('password')
 
     # Check that servers are really online
-    while True:
+    timeout = SLEEP_TIME
+    for attempt in range(START_ATTEMPTS):
         try:
-            # Check Key Server
-            prov.get_token(ServerType.KeyServer)
+            # Wait for ports to open, then check that servers answer
+            shd.wait_for_servers(timeout)
+            # Check Key Server, token is kept for later requests
+            prov.prefetch_token(ServerType.KeyServer)
             # Check Map Server
-            prov.get_token(ServerType.MapServer)
+            prov.prefetch_token(ServerType.MapServer)
             # Success
             break
         except Exception as e:
-            log.error(f"Server not up yet. Error: {str(e)}")
+            log.error(f"Server not up yet (attempt {attempt + 1}). Error: {str(e)}")
             kill_bg_servers()
-            time.sleep(SLEEP_TIME)
-            subprocess.run([f"{config.WORKING_DIR}src/startServers.sh", "eval"])
-            time.sleep(2 * SLEEP_TIME)
+            shd.wait_for_servers_stopped("eval", SLEEP_TIME)
+            if attempt + 1 < START_ATTEMPTS:
+                subprocess.run([f"{config.WORKING_DIR}src/startServers.sh", "eval"])
+                timeout *= 2
+    else:
+        raise RuntimeError(
+            f"Servers did not start within {START_ATTEMPTS} attempts.")
 
     if real:
-        temp_file = helpers.get_temp_file() + '_temp.pyc'
+        com_file = helpers.get_temp_file() + '_comfile.json'
         record_file = config.WORKING_DIR + "data/real_world_record.txt"
-        cmd = ["python3", "src/producer.py", "pastprov", "password",
-               "-f", record_file, "-e", temp_file]
-        provision = subprocess.Popen(cmd, universal_newlines=True,
-                                     stderr=subprocess.PIPE)
-        provision.wait()
+        cmd = [sys.executable, "src/producer.py", "pastprov", "password",
+               "-f", record_file, "-e", com_file]
+        # Output is not read, the producer logs to its own log file
+        subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        shd.remove_files([com_file])
     else:
         prov.full_provide_eval(MAP_NAME, TOOL_PROPERTIES, p, STORED_VALUES)
 
 
 def start(com_file: str, real: bool = False) -> subprocess.Popen:
     """Start a client App process and return it."""
-    cmd = ["python3", "src/producer.py", "testprod", "password",
+    cmd = [sys.executable, "src/producer.py", "testprod", "password",
            "-m", f"{MAP_NAME}", "-e", com_file]
     if real:
         map_name = ('DMU 65 monoBLOCK', 'steel', 'Fraisa p8400610')
-        cmd = ["python3", "src/producer.py", "testprod", "password",
+        cmd = [sys.executable, "src/producer.py", "testprod", "password",
                "-m", f"{map_name}", "-e", com_file]
     if config.DEBUG:
         cmd.append('-vv')
-    proc = subprocess.Popen(cmd, universal_newlines=True,
-                            stderr=subprocess.PIPE)
+    # Output is not read, the producer logs to its own log file
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
     return proc
 
 
+def run_query(s: int, p: int, com_keys: tuple[str, ...], csv_fd: TextIO,
+              ram_fd: TextIO | None = None, real: bool = False) -> None:
+    """
+    Run one regular query, repeating it until it succeeds, and write its row.
+
+    :param s: Number of set
+    :param p: Number of points
+    :param com_keys: Measurements to take from the com file, in column order
+    :param csv_fd: Result file
+    :param ram_fd: RAM result file, only used if RAM is measured
+    :param real: Query real-world map
+    """
+    temp_files = []
+    success = False
+    while not success:
+        process = None
+        com_file = helpers.get_temp_file() + '_comfile.json'
+        temp_files.append(com_file)
+        e = None
+        try:
+            error = ""
+            # Start data measurements
+            measurements, measurement_files = \
+                shd.start_server_measurements()
+            temp_files.extend(measurement_files)
+            shd.wait_for_pcap_files(measurement_files)
+
+            process = start(com_file, real)
+            process.wait()
+
+            # Load com file
+            with open(com_file, "r", encoding='utf-8') as fd:
+                e = json.load(fd)
+            if e['result'] is None:
+                # full_retrieve did not terminate
+                raise RuntimeError(e['error'])
+            ram_usage = e['ram_usage_json']
+
+            # Kill TCPDUMP
+            helpers.kill_tcpdump()
+            # Wait for termination
+            shd.wait_for_processes(measurements, 30)
+
+            # Get Data Amount results
+            ((tks_byte, tks_pkt), (fks_byte, fks_pkt),
+             (tms_byte, tms_pkt), (fms_byte, fms_pkt)) = \
+                shd.read_server_measurements(measurement_files)
+
+            row_prefix = f"{shd.timestamp()};{s};{p};"
+            row = row_prefix + ";".join((
+                *(str(e[k]) for k in com_keys),
+                str(fks_byte),
+                str(fks_pkt),
+                str(tks_byte),
+                str(tks_pkt),
+                str(fms_byte),
+                str(fms_pkt),
+                str(tms_byte),
+                str(tms_pkt),
+                error
+            ))
+            csv_fd.write(f"{row}\n")
+            if RAM:
+                ram_fd.write(f"{row_prefix}{ram_usage}\n")
+            success = True
+        except Exception as e:
+            # Traceback only in debug mode, the producer logs its own errors
+            log.warning(f"Query failed, retrying. Error: {str(e)}",
+                        exc_info=log.isEnabledFor(logging.DEBUG))
+            success = False
+        finally:
+            # Clean Up
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(5)
+                except subprocess.TimeoutExpired:
+                    # Terminate was not enough
+                    process.kill()
+            # Kill TCPDUMP
+            helpers.kill_tcpdump()
+    # Remove Tempfiles
+    shd.remove_files(temp_files)
+
+
 def main(base_filename: str, resume: bool = False, full: bool = False,
          invalid: bool = False, real: bool = False):
     """Execute evaluation."""
+    # Imported here to keep --help fast. The producer configures the root
+    # logger on import, so the eval logger is configured afterwards.
+    from src.producer import Producer
+    configure_root_logger(logging.INFO, config.DATA_DIR + 'regular_query.log',
+                          queued=True)
+
     file_path = DIRECTORY + base_filename + ".csv"
     ram_path = DIRECTORY + base_filename + '_ram.csv'
     if not resume or not os.path.exists(file_path):
-        if PAILLIER and not invalid:
-            row_fmt = ("TIMESTAMP;"
-                    "SET;"
-                    "#Points;"
-                    "StartTime[s];"
-                    "ClientKeyRetrievalTime[s];"
-                    "ComparisonRequestTime[s];"
-                    "ComparisonTime[s];"
-                    "PointRetrievalTime[s];"
-                    "PointDecryptionTime[s];"
-                    "FromKS[Byte];FromKS[Pkt];"
-                    "ToKS[Byte];ToKs[Pkt];"
-                    "FromMS[Byte];FromMS[Pkt];"
-                    "ToMS[Byte];ToMS[Pkt];"
-                    "Error")
-        elif invalid:
-            row_fmt = ("TIMESTAMP;"
-                    "SET;"
-                    "#Points;"
-                    "StartTime[s];"
-                    "ClientKeyRetrievalTime[s];"
-                    "PointRetrievalTime[s];"
-                    "PointDecryptionTime[s];"
-                    "FromKS[Byte];FromKS[Pkt];"
-                    "ToKS[Byte];ToKs[Pkt];"
-                    "FromMS[Byte];FromMS[Pkt];"
-                    "ToMS[Byte];ToMS[Pkt];"
-                    "Error")
-        else:
-            row_fmt = ("TIMESTAMP;"
-                    "SET;"
-                    "#Points;"
-                    "StartTime[s];"
-                    "ClientKeyRetrievalTime[s];"
-                    "PlaintextPointRetrievalTime[s];"
-                    "FromKS[Byte];FromKS[Pkt];"
-                    "ToKS[Byte];ToKs[Pkt];"
-                    "FromMS[Byte];FromMS[Pkt];"
-                    "ToMS[Byte];ToMS[Pkt];"
-                    "Error")
-        write_header(file_path, row_fmt)
+        write_header(file_path, ROW_FMTS[(PAILLIER, invalid)])
         if RAM:
             row_fmt = "TIMESTAMP;SET;#Points;json.dumps(ram_usage)"
             write_header(ram_path, row_fmt)
-    shd.set_paillier(PAILLIER)
-    shd.set_tls(TLS)
-    shd.set_ram(RAM)
+    shd.set_config_many({'USE_PAILLIER': PAILLIER, 'USE_TLS': TLS,
+                         'MEASURE_RAM': RAM})
     points = NUM_POINTS
     if invalid:
         shd.set_valid(False)
         points = [2000, 4000, 6000]
 
-    if full or real:
-        p = config.MAP_SIZE
-        if real:
-            p = 30
-        log.info("Preparing...")
-        preparation(p, real)
-        for s in lb(range(config.SETS), "Sets", position=0):
-            success = False
-            while not success:
-                process = None
-                com_file = helpers.get_temp_file() + '_comfile.pyc'
-                e = None
-                os.makedirs(config.TEMP_DIR, exist_ok=True)
-                try:
-                    error = ""
-                    tks, tks_file = helpers.start_trans_measurement(
-                        config.KEY_API_PORT, direction="dst", sleep=False
-                    )
-                    fks, fks_file = helpers.start_trans_measurement(
-                        config.KEY_API_PORT, direction="src", sleep=False
-                    )
-                    tms, tms_file = helpers.start_trans_measurement(
-                        config.MAP_API_PORT, direction="dst", sleep=False
-                    )
-                    fms, fms_file = helpers.start_trans_measurement(
-                        config.MAP_API_PORT, direction="src", sleep=False
-                    )
-                    measurements = [tks, fks, tms, fms]
-                    time.sleep(0.5)
-
-                    process = start(com_file, real)
-                    process.wait()
-
-                    with open(com_file, "rb") as fd:
-                        e = pickle.load(fd)
-                    if e['result'] is None:
-                        raise RuntimeError(e['error'])
-                    ram_usage = e['ram_usage']
-
-                    helpers.kill_tcpdump()
-                    for proc in measurements:
-                        proc.wait(30)
-
-                    fks_byte, fks_pkt = helpers.read_tcpstat_from_file(
-                        fks_file)
-                    tks_byte, tks_pkt = helpers.read_tcpstat_from_file(
-                        tks_file)
-                    fms_byte, fms_pkt = helpers.read_tcpstat_from_file(
-                        fms_file)
-                    tms_byte, tms_pkt = helpers.read_tcpstat_from_file(
-                        tms_file)
-
-                    if PAILLIER and not invalid:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ";".join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time']),
-                                str(e['client_key_retrieval_time']),
-                                str(e['comparison_request_time']),
-                                str(e['comparison_time']),
-                                str(e['point_retrieval_time']),
-                                str(e['point_decryption_time']),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(f"{row}\n")
-                    elif PAILLIER and invalid:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ";".join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time']),
-                                str(e['client_key_retrieval_time']),
-                                str(e['plaintext_point_retrieval_time']),
-                                str(e['point_decryption_time']),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(f"{row}\n")
-                    else:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ";".join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time']),
-                                str(e['client_key_retrieval_time']),
-                                str(e['plaintext_point_retrieval_time']),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(f"{row}\n")
-                    if RAM:
-                        with open(ram_path, "a", encoding='utf-8') as fd:
-                            fd.write(
-                                ';'.join(
-                                    (
-                                        time.strftime('%Y-%m-%d %H:%M:%S'),
-                                        str(s),
-                                        str(p),
-                                        json.dumps(ram_usage)
-                                    )
-                                ) + '\n'
-                            )
-                    success = True
-                except Exception as e:
-                    log.exception(str(e))
-                    success = False
-                finally:
-                    if process is not None:
-                        process.terminate()
-                        try:
-                            process.wait(5)
-                        except subprocess.TimeoutExpired:
-                            process.kill()
-                    helpers.kill_tcpdump()
-            shutil.rmtree(config.TEMP_DIR, ignore_errors=True)
-        return
-
-    for s in lb(range(config.SETS), "Sets", position=0):
-        for p in lb(points, "Number of Points", leave=False):
+    com_keys = ROW_COM_KEYS[(PAILLIER, invalid)]
+
+    # Provider is reused for all preparations
+    prov = Producer('pastprov')
+    prov.set_password('password')
+
+    # Keep result files open for the whole evaluation, rows are flushed per set
+    with contextlib.ExitStack() as stack:
+        csv_fd = stack.enter_context(open(file_path, "a", encoding='utf-8'))
+        ram_fd = None
+        if RAM:
+            ram_fd = stack.enter_context(open(ram_path, "a", encoding='utf-8'))
+        if full or real:
+            p = config.MAP_SIZE
+            if real:
+                p = 30
             log.info("Preparing...")
-            preparation(p)
-            success = False
-            while not success:
-                process = None
-                com_file = helpers.get_temp_file() + '_comfile.pyc'
-                e = None
-                # May be deleted by clean-up of prev. round
-                os.makedirs(config.TEMP_DIR, exist_ok=True)
-                try:
-                    error = ""
-                    # Start data measurements
-                    tks, tks_file = helpers.start_trans_measurement(
-                        config.KEY_API_PORT, direction="dst", sleep=False
-                    )
-                    fks, fks_file = helpers.start_trans_measurement(
-                        config.KEY_API_PORT, direction="src", sleep=False
-                    )
-                    tms, tms_file = helpers.start_trans_measurement(
-                        config.MAP_API_PORT, direction="dst", sleep=False
-                    )
-                    fms, fms_file = helpers.start_trans_measurement(
-                        config.MAP_API_PORT, direction="src", sleep=False
-                    )
-                    measurements = [tks, fks, tms, fms]
-                    time.sleep(0.5)
-
-                    process = start(com_file)
-                    process.wait()
-
-                    # Load com file
-                    with open(com_file, "rb") as fd:
-                        e = pickle.load(fd)
-                    if e['result'] is None:
-                        # full_retrieve did not terminate
-                        raise RuntimeError(e['error'])
-                    ram_usage = e['ram_usage']
-
-                    # Kill TCPDUMP
-                    helpers.kill_tcpdump()
-                    for proc in measurements:
-                        # Wait for termination
-                        proc.wait(30)
-
-                    # Get Data Amount results
-                    fks_byte, fks_pkt = helpers.read_tcpstat_from_file(
-                        fks_file)
-                    tks_byte, tks_pkt = helpers.read_tcpstat_from_file(
-                        tks_file)
-                    fms_byte, fms_pkt = helpers.read_tcpstat_from_file(
-                        fms_file)
-                    tms_byte, tms_pkt = helpers.read_tcpstat_from_file(
-                        tms_file)
-
-                    if PAILLIER and not invalid:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ";".join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time']),
-                                str(e['client_key_retrieval_time']),
-                                str(e['comparison_request_time']),
-                                str(e['comparison_time']),
-                                str(e['point_retrieval_time']),
-                                str(e['point_decryption_time']),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(f"{row}\n")
-                    elif PAILLIER and invalid:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ";".join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time']),
-                                str(e['client_key_retrieval_time']),
-                                str(e['plaintext_point_retrieval_time']),
-                                str(e['point_decryption_time']),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(f"{row}\n")
-                    else:
-                        with open(file_path, "a", encoding='utf-8') as fd:
-                            row = ";".join((
-                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                str(s),
-                                str(p),
-                                str(e['start_time']),
-                                str(e['client_key_retrieval_time']),
-                                str(e['plaintext_point_retrieval_time']),
-                                str(fks_byte),
-                                str(fks_pkt),
-                                str(tks_byte),
-                                str(tks_pkt),
-                                str(fms_byte),
-                                str(fms_pkt),
-                                str(tms_byte),
-                                str(tms_pkt),
-                                error
-                            ))
-                            fd.write(f"{row}\n")
-                    if RAM:
-                        with open(ram_path, "a", encoding='utf-8') as fd:
-                            fd.write(
-                                ';'.join(
-                                    (
-                                        time.strftime('%Y-%m-%d %H:%M:%S'),
-                                        str(s),
-                                        str(p),
-                                        json.dumps(ram_usage)
-                                    )
-                                ) + '\n'
-                            )
-                    success = True
-                except Exception as e:
-                    log.exception(str(e))
-                    success = False
-                finally:
-                    # Clean Up
-                    if process is not None:
-                        process.terminate()
-                        try:
-                            process.wait(5)
-                        except subprocess.TimeoutExpired:
-                            # Terminate was not enough
-                            process.kill()
-                    # Kill TCPDUMP
-                    helpers.kill_tcpdump()
-            # Remove Tempfiles
-            shutil.rmtree(config.TEMP_DIR, ignore_errors=True)
+            preparation(p, prov, real)
+        for s in lb(range(config.SETS), "Sets", position=0):
+            if full or real:
+                run_query(s, p, com_keys, csv_fd, ram_fd, real)
+            else:
+                for p in lb(points, "Number of Points", leave=False):
+                    log.info("Preparing...")
+                    try:
+                        preparation(p, prov)
+                    except RuntimeError as e:
+                        log.exception(f"Skipping set {s} with {p} points: {str(e)}")
+                        continue
+                    run_query(s, p, com_keys, csv_fd, ram_fd)
+            csv_fd.flush()
+            if RAM:
+                ram_fd.flush()
 
 
 def get_regular_query_parser() -> argparse.ArgumentParser:
@@ -526,9 +361,13 @@ def get_regular_query_parser() -> argparse.ArgumentParser:
 
 
 if __name__ == '__main__':
-    shd.set_eval(True)
     parser = get_regular_query_parser()
     args = parser.parse_args()
+    atexit.register(shutil.rmtree, config.TEMP_DIR, True)
+    atexit.register(shd.set_eval, config.EVAL)
+    atexit.register(shd.reset_config)
+    atexit.register(kill_bg_servers)
+    shd.set_eval(True)
     STORED_VALUES = args.stored
     PAILLIER = args.paillier
     TLS = args.tls
@@ -13,7 +13,6 @@ import contextlib
 import json
 import logging
 import os
-import pickle
 import shutil
 import subprocess
 import sys
@@ -22,10 +21,7 @@ import time
 from src.eval import shared as shd
 from src.eval.shared import lb
 from src.lib import config, helpers
-from src.lib import db_cli as db
 from src.lib.logging import configure_root_logger
-from src.lib.user import UserType, ServerType
-from src.producer import Producer
 
 
 # Constants -------------------------------------------------------------------
@@ -35,17 +31,17 @@ MAP_NAMES = [('5rLhPSFu', 'hardened steel', 'zJcgKqGI'),
              ('5rLhPSFu', 'hardened steel', 'aqtihJoH')]
 TOOL_PROPERTIES = ('end mill', 4)
 DIRECTORY = config.EVAL_DIR + "reverse_query" + "/"
-os.makedirs(DIRECTORY, exist_ok=True)
 NUM_POINTS = 2000
 NUM_MAPS = [1, 2, 3]
 PAILLIER = True
 TLS = True
 RAM = True
-log = configure_root_logger(logging.INFO, config.DATA_DIR + 'reverse_query.log')
-atexit.register(shutil.rmtree, config.TEMP_DIR, True)
-atexit.register(shd.set_eval, config.EVAL)
-atexit.register(shd.reset_config)
-atexit.register(helpers.reset_tc)
+# Measurements taken from the producer's com file, in CSV column order
+COM_KEYS_START = ('start_time', 'ids_retrieval_time')
+COM_KEYS_PAILLIER = COM_KEYS_START + ('preview_retrieval_time',
+                                      'preview_decryption_time')
+COM_KEYS_PLAIN = COM_KEYS_START + ('plaintext_preview_retrieval_time',)
+log = logging.getLogger(__name__)
 # -----------------------------------------------------------------------------
 
 
@@ -72,9 +68,6 @@ def kill_bg_servers() -> None:
                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 
-atexit.register(kill_bg_servers)
-
-
 def preparation(m: int, p: int) -> None:
     """
     Prepare databases and start background tasks.
@@ -82,17 +75,16 @@ def preparation(m: int, p: int) -> None:
     :param m: Number of maps
     :param p: Number of points
     """
+    from src.lib import db_cli as db
+    from src.lib.user import UserType, ServerType
+    from src.producer import Producer
+
     # Kill old processes if running
     kill_bg_servers()
     time.sleep(SLEEP_TIME)
 
-    data_dir = config.DATA_DIR
-
     log.info("Removing Databases.")
-    with contextlib.suppress(FileNotFoundError):
-        # Remove Databases
-        os.remove(data_dir + config.KEY_DB)
-        os.remove(data_dir + config.MAP_DB)
+    shd.remove_databases()
 
     # Add User
     log.info("Prepare User DB.")
@@ -141,6 +133,13 @@ def start(com_file: str) -> subprocess.Popen:
 
 def main(base_filename: str, resume: bool = False, invalid: bool = False):
     """Execute evaluation."""
+    # The producer configures the root logger on import, so the eval
+    # logger is configured afterwards.
+    import src.producer  # noqa: F401
+    configure_root_logger(logging.INFO, config.DATA_DIR + 'reverse_query.log',
+                          queued=True)
+
+    os.makedirs(DIRECTORY, exist_ok=True)
     file_path = DIRECTORY + base_filename + ".csv"
     ram_path = DIRECTORY + base_filename + '_ram.csv'
     if not resume or not os.path.exists(file_path):
@@ -177,9 +176,8 @@ def main(base_filename: str, resume: bool = False, invalid: bool = False):
         if RAM:
             row_fmt = "TIMESTAMP;SET;#Maps;Latency;Bandwidth;json.dumps(ram_usage)"
             write_header(ram_path, row_fmt)
-    shd.set_paillier(PAILLIER)
-    shd.set_tls(TLS)
-    shd.set_ram(RAM)
+    shd.set_config_many({'USE_PAILLIER': PAILLIER, 'USE_TLS': TLS,
+                         'MEASURE_RAM': RAM})
     points = NUM_POINTS
     if invalid:
         points = 2000
@@ -190,146 +188,97 @@ def main(base_filename: str, resume: bool = False, invalid: bool = False):
         latency = [0, 100, 200]
         bandwidth = [0, 1000, 10000]
 
-    for s in lb(range(config.SETS), "Sets", position=0):
-        for m in lb(NUM_MAPS, "Number of Maps", leave=False):
-            log.info("Preparing...")
-            preparation(m, points)
-            for l in lb(latency, "Latency", leave=False):
-                for b in lb(bandwidth, "Bandwidth", leave=False):
-                    if l and b:
-                        continue
-                    success = False
-                    while not success:
-                        if l or b:
-                            helpers.set_tc(l, b)
-                        process = None
-                        com_file = helpers.get_temp_file() + '_comfile.pyc'
-                        e = None
-                        # May be deleted by clean-up of prev. round
-                        os.makedirs(config.TEMP_DIR, exist_ok=True)
-                        try:
-                            error = ""
-                            # Start data measurements
-                            tks, tks_file = helpers.start_trans_measurement(
-                                config.KEY_API_PORT, direction="dst", sleep=False
-                            )
-                            fks, fks_file = helpers.start_trans_measurement(
-                                config.KEY_API_PORT, direction="src", sleep=False
-                            )
-                            tms, tms_file = helpers.start_trans_measurement(
-                                config.MAP_API_PORT, direction="dst", sleep=False
-                            )
-                            fms, fms_file = helpers.start_trans_measurement(
-                                config.MAP_API_PORT, direction="src", sleep=False
-                            )
-                            measurements = [tks, fks, tms, fms]
-                            time.sleep(0.5)
-
-                            process = start(com_file)
-                            process.wait()
-
-                            # Load com file
-                            with open(com_file, "rb") as fd:
-                                e = pickle.load(fd)
-                            if e['result'] is None:
-                                # full_retrieve did not terminate
-                                raise RuntimeError(e['error'])
-                            ram_usage = e['ram_usage']
-
-                            # Kill TCPDUMP
-                            helpers.kill_tcpdump()
-                            for proc in measurements:
+    com_keys = COM_KEYS_PAILLIER if PAILLIER else COM_KEYS_PLAIN
+
+    # Keep result files open for the whole evaluation, rows are flushed per set
+    with contextlib.ExitStack() as stack:
+        csv_fd = stack.enter_context(open(file_path, "a", encoding='utf-8'))
+        if RAM:
+            ram_fd = stack.enter_context(open(ram_path, "a", encoding='utf-8'))
+        for s in lb(range(config.SETS), "Sets", position=0):
+            for m in lb(NUM_MAPS, "Number of Maps", leave=False):
+                log.info("Preparing...")
+                preparation(m, points)
+                for l in lb(latency, "Latency", leave=False):
+                    for b in lb(bandwidth, "Bandwidth", leave=False):
+                        if l and b:
+                            continue
+                        success = False
+                        temp_files = []
+                        while not success:
+                            if l or b:
+                                helpers.set_tc(l, b)
+                            process = None
+                            com_file = helpers.get_temp_file() + '_comfile.json'
+                            temp_files.append(com_file)
+                            e = None
+                            try:
+                                error = ""
+                                # Start data measurements
+                                measurements, measurement_files = \
+                                    shd.start_server_measurements()
+                                temp_files.extend(measurement_files)
+                                shd.wait_for_pcap_files(measurement_files)
+
+                                process = start(com_file)
+                                process.wait()
+
+                                # Load com file
+                                with open(com_file, "r", encoding='utf-8') as fd:
+                                    e = json.load(fd)
+                                if e['result'] is None:
+                                    # full_retrieve did not terminate
+                                    raise RuntimeError(e['error'])
+                                ram_usage = e['ram_usage_json']
+
+                                # Kill TCPDUMP
+                                helpers.kill_tcpdump()
                                 # Wait for termination
-                                proc.wait(30)
-
-                            # Get Data Amount results
-                            fks_byte, fks_pkt = helpers.read_tcpstat_from_file(
-                                fks_file)
-                            tks_byte, tks_pkt = helpers.read_tcpstat_from_file(
-                                tks_file)
-                            fms_byte, fms_pkt = helpers.read_tcpstat_from_file(
-                                fms_file)
-                            tms_byte, tms_pkt = helpers.read_tcpstat_from_file(
-                                tms_file)
-
-                            if PAILLIER:
-                                with open(file_path, "a", encoding='utf-8') as fd:
-                                    row = ";".join((
-                                        time.strftime('%Y-%m-%d %H:%M:%S'),
-                                        str(s),
-                                        str(m),
-                                        str(l),
-                                        str(b),
-                                        str(e['start_time']),
-                                        str(e['ids_retrieval_time']),
-                                        str(e['preview_retrieval_time']),
-                                        str(e['preview_decryption_time']),
-                                        str(fks_byte),
-                                        str(fks_pkt),
-                                        str(tks_byte),
-                                        str(tks_pkt),
-                                        str(fms_byte),
-                                        str(fms_pkt),
-                                        str(tms_byte),
-                                        str(tms_pkt),
-                                        error
-                                    ))
-                                    fd.write(f"{row}\n")
-                            else:
-                                with open(file_path, "a", encoding='utf-8') as fd:
-                                    row = ";".join((
-                                        time.strftime('%Y-%m-%d %H:%M:%S'),
-                                        str(s),
-                                        str(m),
-                                        str(l),
-                                        str(b),
-                                        str(e['start_time']),
-                                        str(e['ids_retrieval_time']),
-                                        str(e['plaintext_preview_retrieval_time']),
-                                        str(fks_byte),
-                                        str(fks_pkt),
-                                        str(tks_byte),
-                                        str(tks_pkt),
-                                        str(fms_byte),
-                                        str(fms_pkt),
-                                        str(tms_byte),
-                                        str(tms_pkt),
-                                        error
-                                    ))
-                                    fd.write(f"{row}\n")
-                            if RAM:
-                                with open(ram_path, "a", encoding='utf-8') as fd:
-                                    fd.write(
-                                        ';'.join(
-                                            (
-                                                time.strftime('%Y-%m-%d %H:%M:%S'),
-                                                str(s),
-                                                str(m),
-                                                str(l),
-                                                str(b),
-                                                json.dumps(ram_usage)
-                                            )
-                                        ) + '\n'
-                                    )
-                            success = True
-                        except Exception as e:
-                            log.exception(str(e))
-                            success = False
-                        finally:
-                            if l or b :
-                                helpers.reset_tc()
-                            # Clean Up
-                            if process is not None:
-                                process.terminate()
-                                try:
-                                    process.wait(5)
-                                except subprocess.TimeoutExpired:
-                                    # Terminate was not enough
-                                    process.kill()
-                            # Kill TCPDUMP
-                            helpers.kill_tcpdump()
-                    # Remove Tempfiles
-                    shutil.rmtree(config.TEMP_DIR, ignore_errors=True)
+                                shd.wait_for_processes(measurements, 30)
+
+                                # Get Data Amount results
+                                ((tks_byte, tks_pkt), (fks_byte, fks_pkt),
+                                 (tms_byte, tms_pkt), (fms_byte, fms_pkt)) = \
+                                    shd.read_server_measurements(measurement_files)
+
+                                row_prefix = f"{shd.timestamp()};{s};{m};{l};{b};"
+                                row = row_prefix + ";".join((
+                                    *(str(e[k]) for k in com_keys),
+                                    str(fks_byte),
+                                    str(fks_pkt),
+                                    str(tks_byte),
+                                    str(tks_pkt),
+                                    str(fms_byte),
+                                    str(fms_pkt),
+                                    str(tms_byte),
+                                    str(tms_pkt),
+                                    error
+                                ))
+                                csv_fd.write(f"{row}\n")
+                                if RAM:
+                                    ram_fd.write(f"{row_prefix}{ram_usage}\n")
+                                success = True
+                            except Exception as e:
+                                log.exception(str(e))
+                                success = False
+                            finally:
+                                if l or b :
+                                    helpers.reset_tc()
+                                # Clean Up
+                                if process is not None:
+                                    process.terminate()
+                                    try:
+                                        process.wait(5)
+                                    except subprocess.TimeoutExpired:
+                                        # Terminate was not enough
+                                        process.kill()
+                                # Kill TCPDUMP
+                                helpers.kill_tcpdump()
+                        # Remove Tempfiles
+                        shd.remove_files(temp_files)
+            csv_fd.flush()
+            if RAM:
+                ram_fd.flush()
 
 
 def get_reverse_query_parser() -> argparse.ArgumentParser:
@@ -357,6 +306,11 @@ if __name__ == '__main__':
         sys.exit(-1)
     parser = get_reverse_query_parser()
     args = parser.parse_args()
+    atexit.register(shutil.rmtree, config.TEMP_DIR, True)
+    atexit.register(shd.set_eval, config.EVAL)
+    atexit.register(shd.reset_config)
+    atexit.register(helpers.reset_tc)
+    atexit.register(kill_bg_servers)
     PAILLIER = args.paillier
     TLS = args.tls
     RAM = args.ram
@@ -6,17 +6,30 @@ Author: Joseph Leisten
 E-mail: joseph.leisten@rwth-aachen.de
 """
 
+import contextlib
 import logging
-import secrets
+import os
+import re
+import socket
+import sqlite3
 import subprocess
+import time
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 from tqdm import tqdm
 
-from src.lib import config
+from src.lib import config, helpers
 
 
 log = logging.getLogger(__name__)
+SERVERS = ((config.KEY_HOSTNAME, config.KEY_API_PORT),
+           (config.MAP_HOSTNAME, config.MAP_API_PORT))
+# Size of the global header of a pcap file in bytes
+PCAP_HEADER_SIZE = 24
+# Last second and its formatted timestamp
+_timestamp_cache = [-1, ""]
 
 
 def reset_config() -> None:
@@ -24,16 +37,26 @@ def reset_config() -> None:
     subprocess.run(['git', 'checkout', '-f', 'src/lib/config.py'])
 
 
+def set_config_many(pairs: dict[str, bool]) -> None:
+    """
+    Set several variables in config file with one read and one write.
+
+    :param pairs: Mapping of variable name to new value
+    """
+    path = config.WORKING_DIR + "src/lib/config.py"
+    with open(path, "r", encoding='utf-8') as f:
+        text = f.read()
+    for variable, v in pairs.items():
+        text = re.sub(rf'^{re.escape(variable)} =.*$', f'{variable} = {v}',
+                      text, count=1, flags=re.MULTILINE)
+    # Overwrite
+    with open(path, "w", encoding='utf-8') as f:
+        f.write(text)
+
+
 def set_config(variable: str, v: bool) -> None:
     """Set chosen variable in config file to given value."""
-    with open(config.WORKING_DIR + "src/lib/config.py", "r", encoding='utf-8') as f:
-        lines = f.readlines()
-    for i, line in enumerate(lines):
-        if f"{variable} =" in line:
-            lines[i] = f"{variable} = {str(v)}\n"
-    # Overwrite
-    with open(config.WORKING_DIR + "src/lib/config.py", "w", encoding='utf-8') as f:
-        f.writelines(lines)
+    set_config_many({variable: v})
 
 
 def set_eval(v: bool) -> None:
@@ -71,6 +94,49 @@ def lb(o, *args, **kwargs):
         return [o]
 
 
+def timestamp() -> str:
+    """Return current local time for CSV rows, formatted once per second."""
+    now = int(time.time())
+    if _timestamp_cache[0] != now:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = time.strftime('%Y-%m-%d %H:%M:%S',
+                                            time.localtime(now))
+    return _timestamp_cache[1]
+
+
+def remove_files(files: Iterable[str]) -> None:
+    """Remove given files, ignoring files that do not exist."""
+    for file in files:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(file)
+
+
+def remove_databases(data_dir: str = config.DATA_DIR) -> None:
+    """
+    Remove key and map server databases including their WAL files.
+    A stale WAL file would otherwise be replayed into a new database.
+
+    :param data_dir: Directory containing the databases
+    """
+    remove_files(os.path.join(data_dir, db_file) + suffix
+                 for db_file in (config.KEY_DB, config.MAP_DB)
+                 for suffix in ('', '-wal', '-shm'))
+
+
+def db_size(path: str) -> int:
+    """
+    Return size of SQLite database after moving pending
+    changes from its WAL file into the database file.
+
+    :param path: Path of database file
+    :return: Size in bytes
+    """
+    # mode=rw fails for a missing database instead of creating an empty one
+    with contextlib.closing(sqlite3.connect(f"file:{path}?mode=rw", uri=True)) as con:
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.stat(path).st_size
+
+
 def gen_points(map_name: tuple[str, str, str], tool_properties: tuple[str, int],
                file: str, p=config.MAP_SIZE) -> None:
     """
@@ -80,16 +146,148 @@ def gen_points(map_name: tuple[str, str, str], tool_properties: tuple[str, int],
     :param file: Name of file to write points to
     :param p: Number of points
     """
-    ap_ae = [(ap+1, ae+1)
-             for ap in range(config.AP_PRECISION)
-             for ae in range(config.AE_PRECISION)]
-    ap_ae = ap_ae[:p]
-    points = [(ap, ae,
-              secrets.randbelow(config.FZ_PRECISION+1),
-              secrets.randbelow(config.USAGE_PRECISION+1))
-              for ap, ae in ap_ae]
+    # Synthetic values, no cryptographic randomness needed
+    rng = np.random.default_rng()
+    ap, ae = np.divmod(np.arange(min(p, config.MAP_SIZE)), config.AE_PRECISION)
+    fz = rng.integers(0, config.FZ_PRECISION, size=len(ap), endpoint=True)
+    usage = rng.integers(0, config.USAGE_PRECISION, size=len(ap), endpoint=True)
+    points = list(zip((ap + 1).tolist(), (ae + 1).tolist(),
+                      fz.tolist(), usage.tolist()))
     mato = list(map_name)
     mato.extend(list(tool_properties))
-    record = (mato, points[:(p+1)])
+    record = (mato, points)
     with open(file, "w", encoding='utf-8') as fd:
         fd.write(f"{str(record)}\n")
+
+
+def start_server_measurements() -> tuple[list[subprocess.Popen], list[str]]:
+    """
+    Start measurements of transmitted data to and from key and map server.
+    The four tcpdump processes are spawned concurrently.
+
+    :return: Processes and pcap files, each in the order
+        to key server, from key server, to map server, from map server
+    """
+    specs = [(config.KEY_API_PORT, "dst"), (config.KEY_API_PORT, "src"),
+             (config.MAP_API_PORT, "dst"), (config.MAP_API_PORT, "src")]
+    with ThreadPoolExecutor(max_workers=len(specs)) as executor:
+        started = list(executor.map(
+            lambda spec: helpers.start_trans_measurement(
+                spec[0], direction=spec[1], sleep=False),
+            specs))
+    procs, files = zip(*started)
+    return list(procs), list(files)
+
+
+def wait_for_pcap_files(files: Iterable[str], timeout: float = 2) -> None:
+    """
+    Wait until tcpdump has written the pcap header to each file,
+    i.e., until the capture is running.
+
+    :param files: pcap files, e.g., as returned by start_server_measurements
+    :param timeout: Maximal time to wait for all files in seconds
+    """
+    deadline = time.monotonic() + timeout
+    for file in files:
+        while True:
+            with contextlib.suppress(FileNotFoundError):
+                if os.path.getsize(file) >= PCAP_HEADER_SIZE:
+                    break
+            if time.monotonic() >= deadline:
+                log.warning(f"Capture to {file} not started after {timeout}s.")
+                return
+            time.sleep(0.01)
+
+
+def wait_for_processes(procs: Iterable[subprocess.Popen],
+                       timeout: float) -> None:
+    """
+    Wait for several processes with one shared deadline.
+    Processes still running at the deadline are killed.
+
+    :param procs: Processes to wait for
+    :param timeout: Maximal time to wait for all processes in seconds
+    """
+    deadline = time.monotonic() + timeout
+    for proc in procs:
+        try:
+            proc.wait(max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            log.warning(f"Process {proc.pid} did not terminate, killing it.")
+            proc.kill()
+            proc.wait()
+
+
+def port_open(host: str, port: int) -> bool:
+    """Return whether a TCP connection to the given port can be established."""
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_port(host: str, port: int, timeout: float,
+                  max_delay: float = 10) -> bool:
+    """
+    Wait until a TCP connection to the given port can be established.
+    Retries with exponential backoff starting at 100ms.
+
+    :param host: Hostname of server
+    :param port: Port of server
+    :param timeout: Maximal time to wait in seconds
+    :param max_delay: Maximal delay between two attempts in seconds
+    :return: True if the port accepts connections, False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while not port_open(host, port):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(max_delay, delay * 1.7)
+    return True
+
+
+def wait_for_servers(timeout: float) -> None:
+    """
+    Wait until key and map server accept connections.
+
+    :param timeout: Maximal time to wait per server in seconds
+    :raises TimeoutError: If a server does not come up in time
+    """
+    for host, port in SERVERS:
+        if not wait_for_port(host, port, timeout, max_delay=timeout):
+            raise TimeoutError(
+                f"Server at {host}:{port} not reachable after {timeout}s.")
+
+
+def wait_for_servers_stopped(session: str, timeout: float) -> None:
+    """
+    Wait until the tmux session of the servers is gone and
+    their ports do not accept connections anymore.
+
+    :param session: Name of tmux session running the servers
+    :param timeout: Maximal time to wait in seconds
+    """
+    deadline = time.monotonic() + timeout
+    while (subprocess.run(["tmux", "has-session", "-t", session],
+                          stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL).returncode == 0
+           or any(port_open(host, port) for host, port in SERVERS)):
+        if time.monotonic() >= deadline:
+            log.warning(f"Servers still running after {timeout}s.")
+            return
+        time.sleep(0.1)
+
+
+def read_server_measurements(files: list[str]) -> list[tuple[int, int]]:
+    """
+    Read transmitted bytes and packets from several pcap files concurrently.
+
+    :param files: pcap files, e.g., as returned by start_server_measurements
+    :return: Tuple of bytes and packets per file, in the same order
+    """
+    with ThreadPoolExecutor(max_workers=len(files)) as executor:
+        return list(executor.map(helpers.read_tcpstat_from_file, files))
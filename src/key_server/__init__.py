@@ -48,6 +48,9 @@ def create_app(test_config=None, logging_level=config.LOGLEVEL,
     with app.app_context():
         db.create_all()
 
+    # Responses are only read by programs, key order does not matter
+    app.json.sort_keys = False
+
     # Include pages
     app.register_blueprint(main.bp)
     app.register_blueprint(producer.bp)
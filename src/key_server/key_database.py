@@ -68,7 +68,7 @@ class KeyRetrievalClient(db.Model):
     key = db.relationship("StoredKey",
                           uselist=False,
                           foreign_keys=[key_id])
-    timestamp = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
 
 
 class KeyRetrievalProvider(db.Model):
@@ -89,7 +89,7 @@ class KeyRetrievalProvider(db.Model):
     key = db.relationship("StoredKey",
                           uselist=False,
                           foreign_keys=[key_id])
-    timestamp = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
 
 
 class IDRetrieval(db.Model):
@@ -108,4 +108,4 @@ class IDRetrieval(db.Model):
                                uselist=False,
                                foreign_keys=[producer_id])
     count = db.Column(db.Integer, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
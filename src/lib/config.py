@@ -44,8 +44,8 @@ MEASURE_RAM = False
 if EVAL:
     DATA_DIR += 'eval/'
     os.makedirs(DATA_DIR, exist_ok=True)
+# Created on first use by helpers.get_temp_file
 TEMP_DIR = DATA_DIR + 'tmp/'
-os.makedirs(TEMP_DIR, exist_ok=True)
 # -----------------------------------------------------------------------------
 # LOGGING----------------------------------------------------------------------
 LOGLEVEL = logging.DEBUG
@@ -7,7 +7,10 @@ E-mail: joseph.leisten@rwth-aachen.de
 """
 
 import argparse
+import functools
 import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
 
 from flask import Flask
 
@@ -18,10 +21,13 @@ import src.lib.user_database as user_db
 
 NO_PRINT = False
 log: logging.Logger = logging.getLogger(__name__)
+# Flask apps per database URI, reused by subsequent calls of main
+_apps: dict[str, Flask] = {}
 
 
+@functools.lru_cache(maxsize=1)
 def get_db_parser() -> argparse.ArgumentParser:
-    """Return an argument parser for the DB CLIs."""
+    """Return an argument parser for the DB CLIs, built once and reused."""
     db_parser = argparse.ArgumentParser(description="DB CLI")
     action_group = db_parser.add_mutually_exclusive_group(required=True)
     db_parser.add_argument("username", help="Name of User", type=str,
@@ -49,6 +55,32 @@ def get_db_parser() -> argparse.ArgumentParser:
     return db_parser
 
 
+@contextmanager
+def db_context(uri: str) -> Iterator[None]:
+    """
+    Provide an app context for the given database, creating the
+    app only on first use.
+
+    :param uri: SQLAlchemy URI of database
+    """
+    if uri not in _apps:
+        app = Flask(__name__)
+        app.config.from_mapping(
+            SQLALCHEMY_DATABASE_URI=uri,
+            SQLALCHEMY_TRACK_MODIFICATIONS=False
+        )
+        db.init_app(app)
+        _apps[uri] = app
+    with _apps[uri].app_context():
+        try:
+            # Init DB
+            db.create_all()
+            yield
+        finally:
+            # Database file may be removed until the next call
+            db.engine.dispose()
+
+
 def output(*args: str) -> None:
     """Print either via print or via logging."""
     if not NO_PRINT:
@@ -82,15 +114,7 @@ def main(user_type: str, args: list[str], data_dir: str = config.DATA_DIR,
         'key': config.KEY_DB
     }
     for server, db_file in databases.items():
-        app = Flask(__name__)
-        app.config.from_mapping(
-            SQLALCHEMY_DATABASE_URI=f"sqlite:///{data_dir}/{db_file}",
-            SQLALCHEMY_TRACK_MODIFICATIONS=False
-        )
-        db.init_app(app)
-        with app.app_context():
-            # Init DB
-            db.create_all()
+        with db_context(f"sqlite:///{data_dir}/{db_file}"):
             if show_list:
                 users = user_db.get_all_users(user_type)
                 output(f"> Result for {server.capitalize()}-Database: "
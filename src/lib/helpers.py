@@ -7,48 +7,56 @@ E-mail: joseph.leisten@rwth-aachen.de
 """
 
 import base64
+import binascii
 import logging
+import os
 import re
 import subprocess
 import sys
 import time
 import uuid
 from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
 from io import StringIO
 
-import matplotlib.pyplot as plt
-from matplotlib import cm
-import numpy as np
-
 import src.lib.config as config
 
 log: logging.Logger = logging.getLogger(__name__)
-
-
+# Brackets and quotes removed from string representations of records
+_RECORD_DELETE_TABLE = str.maketrans('', '', "()[]'")
+# Thresholds of print_time in ms
+_MS_PER_SEC = 1000
+_MS_PER_MIN = 60 * _MS_PER_SEC
+_MS_PER_HOUR = 60 * _MS_PER_MIN
+# Output of tcpstat with format 'B=%N:p=%n', matched on raw bytes
+_TCPSTAT_RE = re.compile(rb"B=(\d+):p=(\d+)")
+_KILL_TCPDUMP_CMD = ("sudo", "killall", "-s", "2", "tcpdump")
+
+
+@dataclass(slots=True, frozen=True)
 class Record:
     """Record containing multiple points for one map"""
 
-    def __init__(self, map_name: tuple[str, str, str],
-             tool_properties: tuple[str, int],
-             points: list[tuple[int, int, int, int]]) -> None:
-        """Create record."""
-        self.map_name = map_name
-        self.tool_properties = tool_properties
-        self.points = points
+    map_name: tuple[str, str, str]
+    tool_properties: tuple[str, int]
+    points: tuple[tuple[int, int, int, int], ...]
 
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, Record):
-            return False
-        return (self.map_name == other.map_name and
-                self.tool_properties == other.tool_properties and
-                self.points == other.points)
+    def __post_init__(self) -> None:
+        """Store points as tuple, also if given as list."""
+        if not isinstance(self.points, tuple):
+            object.__setattr__(self, 'points', tuple(self.points))
 
-    def __ne__(self, other: object) -> bool:
-        return not self.__eq__(other)
+
+@lru_cache(maxsize=None)
+def _make_temp_dir() -> None:
+    """Create temp directory, only once per process."""
+    os.makedirs(config.TEMP_DIR, exist_ok=True)
 
 
 def get_temp_file() -> str:
     """Generate random tempfile and create directory if none exist."""
+    _make_temp_dir()
     return config.TEMP_DIR + str(uuid.uuid4())
 
 
@@ -93,10 +101,9 @@ def read_tcpstat_from_file(file: str) -> tuple[int, int]:  # pragma no cover
     out_fmt = 'B=%N:p=%n'
     s = subprocess.run(["tcpstat", "-r", file, "-o", f"{out_fmt}", "-1"],
                        stdout=subprocess.PIPE,
-                       stderr=subprocess.PIPE)
-    out = s.stdout
+                       stderr=subprocess.DEVNULL)
     try:
-        m = re.search(r"B=(\d+):p=(\d+)", str(out))
+        m = _TCPSTAT_RE.search(s.stdout)
         b = int(m.group(1))
         packets = int(m.group(2))
     except AttributeError as exc:  # pragma no cover
@@ -109,21 +116,28 @@ def read_tcpstat_from_file(file: str) -> tuple[int, int]:  # pragma no cover
 def kill_tcpdump() -> None:  # pragma no cover
     """Kill all TCPDUMP processes with SIGINT signal."""
     # Kill tcpdump gracefully
-    subprocess.run(["sudo", "killall", "-s", "2", "tcpdump"],
+    subprocess.run(_KILL_TCPDUMP_CMD,
                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 
+def _run_tc(cmd: list[str]) -> None:  # pragma no cover
+    """
+    Run tcconfig command and log its errors.
+
+    :param cmd: Command with arguments
+    """
+    s = subprocess.run(cmd, capture_output=True, text=True)
+    if s.stderr:
+        log.warning(s.stderr)
+
+
 def reset_tc() -> None:  # pragma no cover
     """
     Remove artifical latency and bandwidth limits
     from all ports. [Linux only]
     """
     log.debug("Reset Latency and Rate for all ports.")
-    s = subprocess.Popen(["tcdel", "lo", "--all"],
-                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    out, err = s.communicate()
-    if err != b'':
-        log.warning(str(err))
+    _run_tc(["tcdel", "lo", "--all"])
 
 
 def set_tc(latency:int, bandwidth: int) -> None:  # pragma no cover
@@ -135,30 +149,16 @@ def set_tc(latency:int, bandwidth: int) -> None:  # pragma no cover
     """
     if not bandwidth:
         log.debug(f"Set latency of {latency}ms for all ports.")
-        s = subprocess.Popen(
-            ["tcset", "lo", "--delay", f"{latency}ms"],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out, err = s.communicate()
-        if err != b'':
-            log.warning(str(err))
+        cmd = ["tcset", "lo", "--delay", f"{latency}ms"]
     elif not latency:
         log.debug(f"Set bandwidth of {bandwidth}kbit/s for all ports.")
-        s = subprocess.Popen(
-            ["tcset", "lo", "--rate", f"{bandwidth}kbit/s"],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out, err = s.communicate()
-        if err != b'':
-            log.warning(str(err))
+        cmd = ["tcset", "lo", "--rate", f"{bandwidth}kbit/s"]
     else:
         log.debug(f"Set latency of {latency}ms and "
                   f"bandwidth of {bandwidth}kbit/s for all ports.")
-        s = subprocess.Popen(
-            ["tcset", "lo", "--delay", f"{latency}ms",
-             "--rate", f"{bandwidth}kbit/s"],
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out, err = s.communicate()
-        if err != b'':
-            log.warning(str(err))
+        cmd = ["tcset", "lo", "--delay", f"{latency}ms",
+               "--rate", f"{bandwidth}kbit/s"]
+    _run_tc(cmd)
 
 
 def to_base64(x: int) -> str:
@@ -169,18 +169,18 @@ def to_base64(x: int) -> str:
     :return: Base64 encoded string
     """
     b = x.to_bytes((x.bit_length() + 7) // 8, 'big')
-    return base64.b64encode(b).decode()
+    return binascii.b2a_base64(b, newline=False).decode('ascii')
 
 
-def from_base64(b64: str) -> bytes:
+def from_base64(b64: str) -> int:
     """
     Convert Base64 encoded string back to int.
 
     :param b64: Base64 encoded string
     :return: The decoded int
     """
-    b = base64.b64decode(b64.encode())
-    return int.from_bytes(b, 'big')
+    # binascii accepts the ASCII string directly, no encode needed
+    return int.from_bytes(binascii.a2b_base64(b64), 'big')
 
 
 @contextmanager
@@ -202,17 +202,13 @@ def parse_record(string: str) -> Record:
     :param string: Line generated by src.record_generator
     :return: Record object
     """
-    r_list = string.replace(
-        '(', '').replace(
-        '[', '').replace(
-        ']', '').replace(
-        ')', '').replace(
-        '\'', '').strip('\n').split(', ')
+    r_list = string.translate(_RECORD_DELETE_TABLE).strip('\n').split(', ')
 
     map_name = tuple(r_list[0:3])
     tool_properties = (r_list[3], int(r_list[4]))
-    points = [tuple(int(r) for r in r_list[i:i + 4])
-               for i in range(5, len(r_list), 4)]
+    # Same iterator four times groups the values into points
+    values = map(int, r_list[5:])
+    points = tuple(zip(values, values, values, values))
     return Record(map_name, tool_properties, points)
 
 
@@ -231,22 +227,16 @@ def print_time(t: float) -> str:
     :return: String representation
     """
     t = t * 1000  # to ms
-    if t < 1000:
+    if t < _MS_PER_SEC:
         return f"{round(t, 2)}ms"
-    elif t < 60000:
-        return f"{round(t / 1000, 2)}s"
-    elif t < 3600000:
-        sec = t / 1000
-        minute = int(sec // 60)
-        sec = sec % 60
-        return f"{minute}min {round(sec, 2)}s"
-    else:
-        sec = t / 1000
-        minute = sec // 60
-        sec = sec % 60
-        h = int(minute // 60)
-        minute = int(minute % 60)
-        return f"{h}h {minute}min {round(sec, 2)}s"
+    sec = t / _MS_PER_SEC
+    if t < _MS_PER_MIN:
+        return f"{round(sec, 2)}s"
+    minute, sec = divmod(sec, 60)
+    if t < _MS_PER_HOUR:
+        return f"{int(minute)}min {round(sec, 2)}s"
+    h, minute = divmod(minute, 60)
+    return f"{int(h)}h {int(minute)}min {round(sec, 2)}s"
 
 
 def plot_ap_ae_fz(ap: list[int], ae: list[int], fz: list[int]) -> None:
@@ -257,6 +247,11 @@ def plot_ap_ae_fz(ap: list[int], ae: list[int], fz: list[int]) -> None:
     :param ae: List of cutting width values
     :param fz: List of feed per tooth values
     """
+    # Plotting libraries are slow to import and only needed here
+    import matplotlib.pyplot as plt
+    from matplotlib import cm
+    import numpy as np
+
     ap_arr = np.array(ap)
     ae_arr = np.array(ae)
     fz_arr = np.array(fz)
@@ -279,6 +274,9 @@ def usage_histogram(ap: list[int], ae: list[int], usage: list[int]) -> None:
     :param ae: List of cutting width values
     :param usage: List of usage data values
     """
+    import matplotlib.pyplot as plt
+    import numpy as np
+
     ap_arr = np.array(ap) - 0.25
     ae_arr = np.array(ae) - 0.25
     usage_arr = np.array(usage)
@@ -10,6 +10,7 @@ import logging
 import os
 
 from sqlalchemy.exc import MultipleResultsFound
+from sqlalchemy.orm import contains_eager
 from phe import paillier
 
 from src.lib import config
@@ -55,15 +56,41 @@ class KeyServer:
         log.debug("Get map ID called.")
         machine, material, tool = map_name
         try:
-            key = StoredKey.query.filter(
+            # Join instead of EXISTS subquery and load tool with the key
+            key = StoredKey.query.join(StoredKey.tool).options(
+                contains_eager(StoredKey.tool)).filter(
                 StoredKey.machine == machine,
                 StoredKey.material == material,
-                StoredKey.tool.has(StoredTool.tool == tool)).one_or_none()
+                StoredTool.tool == tool).one_or_none()
         except MultipleResultsFound as e:
             log.exception(str(e))
             raise ValueError from e
         return key
 
+    @staticmethod
+    def _get_key_tuple(map_name: tuple[str, str, str]
+                       ) -> tuple[int, int, int, int] | None:
+        """
+        Return map ID and key values of requested map without
+        loading the StoredKey object.
+
+        :param map_name: Map name (machine, material, tool)
+        :return: Tuple of map ID, n value of public key,
+            and p and q values of private key
+        """
+        machine, material, tool = map_name
+        try:
+            row = StoredKey.query.join(StoredKey.tool).filter(
+                StoredKey.machine == machine,
+                StoredKey.material == material,
+                StoredTool.tool == tool).with_entities(
+                StoredKey.map_id, StoredKey.public_key_n,
+                StoredKey.private_key_p, StoredKey.private_key_q).one_or_none()
+        except MultipleResultsFound as e:
+            log.exception(str(e))
+            raise ValueError from e
+        return None if row is None else tuple(row)
+
     @staticmethod
     def get_key_client_producer(map_name: tuple[str, str, str],
                                 producer: str) -> tuple[int, int, int, int]:
@@ -80,20 +107,19 @@ class KeyServer:
         log.debug("Get key client producer called.")
         client = get_user(UserType.Producer, producer)
 
-        key = KeyServer._get_key(map_name)
+        key = KeyServer._get_key_tuple(map_name)
         if not key:
             raise ValueError("Requested map not stored.")
 
         try:
             t = KeyRetrievalClient(producer=client,
-                                   key=key)
+                                   key_id=key[0])
             db.session.add(t)
             db.session.commit()
         except Exception as e:
             db.session.rollback()
             raise ValueError from e
-        return (key.map_id, key.public_key_n,
-                key.private_key_p, key.private_key_q)
+        return key
 
     @staticmethod
     def get_key_provider(map_name: tuple[str, str, str],
@@ -117,6 +143,9 @@ class KeyServer:
         key = KeyServer._get_key(map_name)
         if not key:
             log.debug("Requested map not stored, adding entry.")
+            # Generate before the first flush, so that the write transaction
+            # is not held open during key generation
+            public_key, private_key = KeyServer._gen_key()
             try:
                 stored_tool = StoredTool.query.filter(
                     StoredTool.tool == tool,
@@ -129,15 +158,14 @@ class KeyServer:
                 log.debug("Requested tool not stored, adding entry.")
                 try:
                     stored_tool = StoredTool(tool=tool,
-                                            tool_type=tool_type,
-                                            tool_diameter=tool_diameter,
-                                            first_provider=provider)
+                                             tool_type=tool_type,
+                                             tool_diameter=tool_diameter,
+                                             first_provider=provider)
                     db.session.add(stored_tool)
-                    db.session.commit() # necessary to set stored_tool.id
+                    db.session.flush()  # sets stored_tool.id, committed below
                 except Exception as e:
                     db.session.rollback()
                     raise ValueError from e
-            public_key, private_key = KeyServer._gen_key()
             try:
                 key = StoredKey(machine=machine,
                                 material=material,
@@ -146,23 +174,16 @@ class KeyServer:
                                 private_key_p=private_key.p,
                                 private_key_q=private_key.q)
                 db.session.add(key)
-                db.session.commit() # necessary to set key.map_id
+                db.session.flush()  # sets key.map_id, committed below
             except Exception as e:
                 db.session.rollback()
                 raise ValueError from e
 
-        else:
-            try:
-                key = StoredKey.query.filter(
-                    StoredKey.machine == machine,
-                    StoredKey.material == material,
-                    StoredKey.tool.has(StoredTool.tool == tool),
-                    StoredKey.tool.has(StoredTool.tool_type == tool_type),
-                    StoredKey.tool.has(StoredTool.tool_diameter == tool_diameter)).one()
-            except ValueError as e:
-                log.exception(str(e))
-                raise ValueError("Different specifications stored for tool, "
-                                 "please contact platform operators.") from e
+        elif (key.tool.tool_type != tool_type
+              or key.tool.tool_diameter != tool_diameter):
+            # Key was found via the unique tool name already
+            raise ValueError("Different specifications stored for tool, "
+                             "please contact platform operators.")
 
         try:
             t = KeyRetrievalProvider(producer=provider,
@@ -201,12 +222,15 @@ class KeyServer:
         machine, material = map_name_prefix
         tool_type, tool_diameter = tool_properties
 
-        keys: list[StoredKey] = StoredKey.query.filter(
+        # Select the returned columns only, no StoredKey objects needed
+        keys = StoredKey.query.join(StoredKey.tool).filter(
             StoredKey.machine == machine,
             StoredKey.material == material,
-            StoredKey.tool.has(StoredTool.tool_type == tool_type),
-            StoredKey.tool.has(StoredTool.tool_diameter == tool_diameter),
-            ~StoredKey.tool.has(StoredTool.tool.in_(excluded_tools))).all()
+            StoredTool.tool_type == tool_type,
+            StoredTool.tool_diameter == tool_diameter,
+            ~StoredTool.tool.in_(excluded_tools)).with_entities(
+            StoredKey.map_id, StoredKey.public_key_n,
+            StoredKey.private_key_p, StoredKey.private_key_q).all()
         if not keys:
             raise ValueError("No relevant maps stored.")
 
@@ -218,7 +242,4 @@ class KeyServer:
         except Exception as e:
             db.session.rollback()
             raise ValueError from e
-        return [
-            (key.map_id, key.public_key_n, key.private_key_p, key.private_key_q)
-            for key in keys
-        ]
+        return [tuple(key) for key in keys]
@@ -9,10 +9,13 @@ Author: Joseph Leisten
 E-mail: joseph.leisten@rwth-aachen.de
 """
 
+import atexit
 import copy
 import logging
 import os
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 
 from src.lib import config
 
@@ -34,6 +37,9 @@ COLORS = {
     'ERROR': RED
 }
 
+# Background thread writing log records if the root logger is queued
+_listener: QueueListener | None = None
+
 FORMAT = "[%(asctime)s][%(levelname)-18s][$BOLD%(name)-22s$RESET]  " \
          "%(message)s ($BOLD%(filename)s$RESET:%(lineno)d) "
 
@@ -81,11 +87,32 @@ def add_filehandler(file: str,
     return filehandler
 
 
+def stop_queue_listener() -> None:
+    """Write remaining queued log records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_queue_listener)
+
+
 def configure_root_logger(logging_level: int,
-                         file: str | None = None) -> logging.Logger:
-    """Add both colored formatter and filehandler to root logger."""
+                         file: str | None = None,
+                         queued: bool = False) -> logging.Logger:
+    """
+    Add both colored formatter and filehandler to root logger.
+
+    :param logging_level: Level of root logger
+    :param file: Additional log file
+    :param queued: Only enqueue records in the calling thread and let a
+        background thread write them to console and files
+    :return: Root logger
+    """
     root = logging.getLogger()
-    for h in root.handlers:
+    stop_queue_listener()
+    for h in list(root.handlers):
         root.removeHandler(h)
     root.setLevel(logging_level)
     add_colored_formatter(logger=root)
@@ -96,4 +123,14 @@ def configure_root_logger(logging_level: int,
         config.WORKING_DIR + 'data/error.log',
         logger=root)
     error_handler.setLevel(logging.ERROR)
+    if queued:
+        global _listener
+        handlers = list(root.handlers)
+        for h in handlers:
+            root.removeHandler(h)
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, *handlers,
+                                  respect_handler_level=True)
+        root.addHandler(QueueHandler(log_queue))
+        _listener.start()
     return root
@@ -11,8 +11,10 @@ import time
 import urllib3
 from abc import ABC, abstractmethod
 from typing import Iterable
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from src.lib import config
 from src.lib.helpers import print_time
@@ -58,6 +60,28 @@ class User(ABC):
         self.user = username
         self.keyserver = KEYSERVER + "/" + self.type
         self.mapserver = MAPSERVER + "/" + self.type
+        # Retrieved but not yet used tokens per server type
+        self.spare_tokens: dict[str, list[str]] = {}
+        # Keep-alive sessions per server (host:port)
+        self.sessions: dict[str, requests.Session] = {}
+
+    def get_session(self, url: str) -> requests.Session:
+        """
+        Return session for the server of the given URL. Sessions keep
+        connections alive, so the TCP and TLS handshakes happen only once.
+
+        :param url: URL to determine server from
+        :return: Session for this server
+        """
+        server = urlsplit(url).netloc
+        if server not in self.sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.verify = config.TLS_ROOT_CA if config.USE_TLS else False
+            self.sessions[server] = session
+        return self.sessions[server]
 
     def get_auth_data(self, url: str) -> tuple[str, str]:
         """
@@ -73,6 +97,9 @@ class User(ABC):
             server_type = ServerType.MapServer
         else:
             raise ValueError(f"Unknown server type for url: {url}")
+        if self.spare_tokens.get(server_type):
+            # Tokens can only be used once
+            return self.user, self.spare_tokens[server_type].pop()
         return self.user, self.get_token(server_type)
 
     def get(self, url: str,
@@ -86,10 +113,7 @@ class User(ABC):
         """
         if auth is None:
             auth = self.get_auth_data(url)
-        if config.USE_TLS:
-            r = requests.get(url, verify=config.TLS_ROOT_CA, auth=auth)
-        else:
-            r = requests.get(url, verify=False, auth=auth)
+        r = self.get_session(url).get(url, auth=auth)
         if r.status_code == 401:
             raise RuntimeError(
                 f"Authentication failed at: {url}.")
@@ -110,10 +134,7 @@ class User(ABC):
         """
         if auth is None:
             auth = self.get_auth_data(url)
-        if config.USE_TLS:
-            r = requests.post(url, verify=config.TLS_ROOT_CA, auth=auth, json=json)
-        else:
-            r = requests.post(url, verify=False, auth=auth, json=json)
+        r = self.get_session(url).post(url, auth=auth, json=json)
         if r.status_code == 401:
             raise RuntimeError(
                 f"Authentication failed at: {url}.")
@@ -157,6 +178,16 @@ class User(ABC):
         else:
             return r['token']
 
+    def prefetch_token(self, server_type: str) -> None:
+        """
+        Retrieve a token from the given server and keep it for the next
+        request to that server.
+
+        :param server_type: Type of server to get the token from
+        """
+        token = self.get_token(server_type)
+        self.spare_tokens.setdefault(server_type, []).append(token)
+
 
     def _retrieve_key_client(self, map_name: tuple[str, str, str]
                              ) -> tuple[int, int, int, int] | None:
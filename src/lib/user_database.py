@@ -14,6 +14,7 @@ from typing import Callable
 
 import sqlalchemy
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import Engine
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from src.lib.helpers import to_base64, from_base64
@@ -22,6 +23,22 @@ from src.lib.user import UserType
 
 db = SQLAlchemy()
 log: logging.Logger = logging.getLogger(__name__)
+# Set on every new SQLite connection. With WAL, commits only append to the
+# -wal file and NORMAL synchronization syncs on checkpoints only.
+SQLITE_PRAGMAS = ("PRAGMA journal_mode=WAL",
+                  "PRAGMA synchronous=NORMAL",
+                  "PRAGMA temp_store=MEMORY")
+
+
+@sqlalchemy.event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Configure new SQLite connections of all engines."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
 
 
 class SecurityInteger(db.TypeDecorator):
@@ -29,7 +46,7 @@ class SecurityInteger(db.TypeDecorator):
 
     impl = db.TEXT
 
-    cache_okay = True
+    cache_ok = True
 
     def process_bind_param(self, value, dialect):
         """Exceute on insert."""
@@ -183,7 +183,7 @@ class RetrievalProducer(db.Model):
                               uselist=False,
                               back_populates="retrieval")
     point_count = db.Column(db.Integer, nullable=False) # Number of retrieved points
-    timestamp = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
 
 
 class BillingProducer(db.Model):
@@ -213,7 +213,7 @@ class BillingProducer(db.Model):
                              nullable=False)
     retrieval = db.relationship("RetrievalProducer",
                                 back_populates="billing")
-    timestamp = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
 
 
 class PreviewBilling(db.Model):
@@ -237,7 +237,7 @@ class PreviewBilling(db.Model):
     map = db.relationship("MapKey",
                           uselist=False,
                           foreign_keys=[map_id])
-    timestamp = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
 
 
 class OffsetBilling(db.Model):
@@ -256,4 +256,4 @@ class OffsetBilling(db.Model):
                              uselist=False,
                              foreign_keys=[client_id])
     point_count = db.Column(db.Integer, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
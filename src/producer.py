@@ -8,8 +8,8 @@ E-mail: joseph.leisten@rwth-aachen.de
 """
 
 import argparse
+import json
 import logging
-import pickle
 import sys
 import time
 
@@ -582,13 +582,16 @@ class Producer(User):
             and list of points [(ap, ae, fz, usage)]
         """
         self.eval['start_time'] = time.monotonic()
-        aggregated_records = {}
+        # Records are immutable, collect records per map and merge points
+        grouped_records: dict[tuple[str, str, str], list[Record]] = {}
         for record in records:
-            map_name = record.map_name
-            if record.map_name in aggregated_records:
-                aggregated_records[map_name].points.extend(record.points)
-            else:
-                aggregated_records[map_name] = record
+            grouped_records.setdefault(record.map_name, []).append(record)
+        aggregated_records = {
+            map_name: group[0] if len(group) == 1 else
+            Record(group[0].map_name, group[0].tool_properties,
+                   [point for r in group for point in r.points])
+            for map_name, group in grouped_records.items()
+        }
 
         try:
             log.info(f"Provide up to {len(records)} records.")
@@ -752,15 +755,17 @@ if __name__ == '__main__':  # pragma no cover
                         retval=True,
                     )
                     prod.eval['result'] = result
-                    prod.eval['ram_usage'] = ram_usage
+                    # Serialized once here, eval scripts copy it as is
+                    prod.eval['ram_usage_json'] = json.dumps(
+                        ram_usage, separators=(',', ':'))
                     prod.eval['error'] = error
                 else:
                     result, error = exec_regular()
                     prod.eval['result'] = result
-                    prod.eval['ram_usage'] = 'N/A'
+                    prod.eval['ram_usage_json'] = 'N/A'
                     prod.eval['error'] = error
-                with open(com_file, "wb") as fd:
-                    pickle.dump(prod.eval, fd)
+                with open(com_file, "w", encoding='utf-8') as fd:
+                    json.dump(prod.eval, fd)
 
             if args.tool:
                 t_list = args.tool.replace(
@@ -790,15 +795,17 @@ if __name__ == '__main__':  # pragma no cover
                         retval=True,
                     )
                     prod.eval['result'] = result
-                    prod.eval['ram_usage'] = ram_usage
+                    # Serialized once here, eval scripts copy it as is
+                    prod.eval['ram_usage_json'] = json.dumps(
+                        ram_usage, separators=(',', ':'))
                     prod.eval['error'] = error
                 else:
                     result, error = exec_reverse()
                     prod.eval['result'] = result
-                    prod.eval['ram_usage'] = 'N/A'
+                    prod.eval['ram_usage_json'] = 'N/A'
                     prod.eval['error'] = error
-                with open(com_file, "wb") as fd:
-                    pickle.dump(prod.eval, fd)
+                with open(com_file, "w", encoding='utf-8') as fd:
+                    json.dump(prod.eval, fd)
 
             if args.file:
                 def exec_provision():
@@ -824,15 +831,17 @@ if __name__ == '__main__':  # pragma no cover
                         retval=True,
                     )
                     prod.eval['result'] = result
-                    prod.eval['ram_usage'] = ram_usage
+                    # Serialized once here, eval scripts copy it as is
+                    prod.eval['ram_usage_json'] = json.dumps(
+                        ram_usage, separators=(',', ':'))
                     prod.eval['error'] = error
                 else:
                     result, error = exec_provision()
                     prod.eval['result'] = result
-                    prod.eval['ram_usage'] = 'N/A'
+                    prod.eval['ram_usage_json'] = 'N/A'
                     prod.eval['error'] = error
-                with open(com_file, "wb") as fd:
-                    pickle.dump(prod.eval, fd)
+                with open(com_file, "w", encoding='utf-8') as fd:
+                    json.dump(prod.eval, fd)
         else:
             if args.map:
                 if not args.apae:
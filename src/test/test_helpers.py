@@ -6,6 +6,7 @@ Author: Joseph Leisten
 E-mail: joseph.leisten@rwth-aachen.de
 """
 
+import os
 from unittest import TestCase
 
 import src.lib.config as config
@@ -28,6 +29,18 @@ class HelpersTest(TestCase):
         self.assertEqual(r1, helpers.parse_record(r1_s))
         self.assertEqual(r2, helpers.parse_record(r2_s))
 
+    def test_record(self):
+        r = helpers.Record(('5rLhPSFu', 'hardened steel', 'zJcgKqGI'),
+                           ('end mill', 4),
+                           [(261, 4, 3412, 6), (35, 28, 24276, 7)])
+        self.assertEqual(((261, 4, 3412, 6), (35, 28, 24276, 7)), r.points)
+        with self.assertRaises(AttributeError):
+            r.points = ()
+        # Immutable records can be deduplicated via hashing
+        r_copy = helpers.Record(r.map_name, r.tool_properties, list(r.points))
+        self.assertEqual(r, r_copy)
+        self.assertEqual(1, len({r, r_copy}))
+
     def test_generate_auth_header(self):
         self.assertEqual(helpers.generate_auth_header("user", "pwd"),
                          [('Authorization', 'Basic dXNlcjpwd2Q=')])
@@ -35,6 +48,9 @@ class HelpersTest(TestCase):
     def test_base64(self):
         x = 13
         self.assertEqual(x, helpers.from_base64(helpers.to_base64(x)))
+        self.assertEqual("DQ==", helpers.to_base64(x))
+        x = 2 ** 2047 + 1  # Size of Paillier key values
+        self.assertEqual(x, helpers.from_base64(helpers.to_base64(x)))
 
     def test_print_time(self):
         t = 10.0 / 1000
@@ -64,3 +80,4 @@ class HelpersTest(TestCase):
             config.TEMP_DIR,
             tmp
         )
+        self.assertTrue(os.path.isdir(config.TEMP_DIR))
@@ -10,6 +10,7 @@ import atexit
 import logging
 import os
 import shutil
+from datetime import datetime
 from unittest import TestCase
 from unittest.mock import Mock, patch
 
@@ -102,6 +103,30 @@ class TestKeyServer(TestCase):
                 record_1.map_name, record_1.tool_properties, "provider")
             expected_res = (1, public_key.n, private_key.p, private_key.q)
             self.assertEqual(expected_res, res)
+            # Stored key is returned again
+            res = s.get_key_provider(
+                record_1.map_name, record_1.tool_properties, "provider")
+            self.assertEqual(expected_res, res)
+            # Same tool with different properties
+            with self.assertRaises(ValueError):
+                s.get_key_provider(record_1.map_name, ('end mill', 8), "provider")
+
+    @patch("src.lib.key_server_backend.KeyServer._gen_key",
+           Mock(return_value=(public_key, private_key)))
+    def test_get_key_provider_rollback(self):
+        s = key_server.KeyServer(test_dir)
+        with mock_app.test_request_context():
+            key_server.db.session.add(key_server.Producer(username="provider",
+                                                          password="password"))
+            key_server.db.session.commit()
+            with patch("src.lib.key_server_backend.KeyRetrievalProvider",
+                       Mock(side_effect=RuntimeError)):
+                with self.assertRaises(ValueError):
+                    s.get_key_provider(record_1.map_name,
+                                       record_1.tool_properties, "provider")
+            # Tool and key are only stored together with the retrieval
+            self.assertIsNone(s._get_key(record_1.map_name))
+            self.assertEqual(0, key_server.StoredTool.query.count())
 
     @patch("src.lib.key_server_backend.KeyServer._gen_key",
            Mock(return_value=(public_key, private_key)))
@@ -127,6 +152,9 @@ class TestKeyServer(TestCase):
                                                           password="password"))
             expected_res = (1, public_key.n, private_key.p, private_key.q)
             self.assertEqual(expected_res, s.get_key_client_producer(record_1.map_name, "client"))
+            retrieval = key_server.KeyRetrievalClient.query.one()
+            self.assertEqual(1, retrieval.key.map_id)
+            self.assertEqual("client", retrieval.producer.username)
             with self.assertRaises(ValueError):
                 s.get_key_client_producer(record_2.map_name, "client")
 
@@ -149,3 +177,15 @@ class TestKeyServer(TestCase):
             with self.assertRaises(ValueError):
                 s.get_map_ids(record_1.map_name[:2], record_1.tool_properties,
                             [record_1.map_name[2]], "client")
+
+    @patch("src.lib.key_server_backend.KeyServer._gen_key",
+           Mock(return_value=(public_key, private_key)))
+    def test_retrieval_timestamp(self):
+        s = key_server.KeyServer(test_dir)
+        with mock_app.test_request_context():
+            key_server.db.session.add(key_server.Producer(username="provider",
+                                                          password="password"))
+            start = datetime.now()
+            s.get_key_provider(record_1.map_name, record_1.tool_properties, "provider")
+            retrieval = key_server.KeyRetrievalProvider.query.one()
+            self.assertGreaterEqual(retrieval.timestamp, start)
@@ -0,0 +1,35 @@
+"""
+Test for regular query eval
+
+Copyright (c) 2024.
+Author: Joseph Leisten
+E-mail: joseph.leisten@rwth-aachen.de
+"""
+
+import logging
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from src.eval import regular_query
+
+
+class RegularQueryTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """Disable logging."""
+        logging.getLogger().setLevel(logging.FATAL)
+
+    @patch("src.lib.db_cli.main")
+    @patch("src.eval.regular_query.shd")
+    @patch("src.eval.regular_query.subprocess.run")
+    def test_preparation_real(self, run, shd, db_main):
+        prov = Mock()
+        regular_query.preparation(30, prov, real=True)
+        # Real-world records are provided by a producer subprocess
+        cmd = run.call_args_list[-1].args[0]
+        self.assertIn("src/producer.py", cmd)
+        com_file = cmd[cmd.index("-e") + 1]
+        self.assertTrue(com_file.endswith("_comfile.json"))
+        shd.remove_files.assert_called_once_with([com_file])
+        prov.full_provide_eval.assert_not_called()
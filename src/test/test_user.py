@@ -44,6 +44,12 @@ class UserTest(TestCase):
         m.set_password("password")
         self.assertEqual(m.password, "password")
 
+    def test_get_session(self):
+        ks = self.m.get_session(f"{KEYSERVER}/mock/retrieve_map_ids")
+        self.assertIs(ks, self.m.get_session(f"{KEYSERVER}/mock/gen_token"))
+        ms = self.m.get_session(f"{MAPSERVER}/mock/gen_token")
+        self.assertIsNot(ks, ms)
+
     @responses.activate
     def test_get_token_success(self):
         urlA = f"{KEYSERVER}/mock/gen_token"
@@ -152,6 +158,22 @@ class UserTest(TestCase):
             self.m.get_auth_data(MAPSERVER + "/something")
         )
 
+    @patch("src.lib.user.User.get_token")
+    def test_prefetch_token(self, get_token):
+        get_token.side_effect = ["spare", "fresh"]
+        self.m.prefetch_token(ServerType.KeyServer)
+        get_token.assert_called_once_with(ServerType.KeyServer)
+        # Spare token is used exactly once
+        self.assertEqual(
+            (self.m.user, "spare"),
+            self.m.get_auth_data(KEYSERVER + "/something")
+        )
+        self.assertEqual(
+            (self.m.user, "fresh"),
+            self.m.get_auth_data(KEYSERVER + "/something")
+        )
+        self.assertEqual(2, get_token.call_count)
+
     @patch("src.lib.user.User.post")
     def test_retrieve_key_client_success(self, post):
         url = f"{KEYSERVER}/mock/retrieve_key_client"
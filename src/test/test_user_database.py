@@ -8,11 +8,14 @@ E-mail: joseph.leisten@rwth-aachen.de
 import logging
 import os
 import shutil
+import warnings
 from time import time
 from unittest import TestCase
 from unittest.mock import patch, Mock
 
 from flask import Flask
+from sqlalchemy import Column, select
+from sqlalchemy.exc import SAWarning
 
 from src.lib import user_database as user_db, config
 from src.lib.user import UserType
@@ -100,6 +103,13 @@ class UserDBTest(TestCase):
         # Token has been removed
         self.assertEqual([], self.p.tokens)
 
+    def test_security_integer_cache(self):
+        # Statements with security integer columns can be cached
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", SAWarning)
+            stmt = select(Column('key', user_db.SecurityInteger()))
+            self.assertIsNotNone(stmt._generate_cache_key())
+
     def test__generate_token(self):
         token = user_db._generate_token()
         self.assertTrue(isinstance(token, str))